@@ -1,14 +1,23 @@
 import os
-from azure.storage.blob import BlobServiceClient, ContainerClient, generate_blob_sas, BlobSasPermissions, ContentSettings
-from azure.ai.contentsafety import ContentSafetyClient
-from azure.ai.contentsafety.models import AnalyzeImageOptions, ImageData, ImageCategory
-from azure.core.credentials import AzureKeyCredential
-from azure.core.exceptions import HttpResponseError, ResourceNotFoundError, ResourceExistsError
 from dotenv import load_dotenv
-from datetime import datetime, timedelta, timezone
+from collections.abc import AsyncIterator
+from datetime import datetime
 from pathlib import Path
-from PIL import Image, ImageOps
-import io
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import hashlib
+import re
+import uuid
+
+from app.storage import create_storage_backend, BlobExistsError, BlobNotFoundError
+from app.content_safety import create_safety_checker
+from app.cache import TTLLRUCache
+from app.image_processing import (
+    process_image_and_variants, make_image_variants, IMAGE_VARIANT_SIZES, IMAGE_VARIANT_FORMATS
+)
+from app.crud import (
+    allocate_asset_sequence, release_asset_sequence, raise_asset_sequence, register_asset, remove_asset, list_asset_names, list_all_asset_names
+)
 
 # Get the directory where azure_utils.py is located
 current_dir = Path(__file__).parent
@@ -25,54 +34,143 @@ AZURE_STORAGE_ACCOUNT_KEY = os.getenv("AZURE_STORAGE_ACCOUNT_KEY")
 
 CONTENT_SAFETY_ENDPOINT = os.getenv("CONTENT_SAFETY_ENDPOINT", "").strip().strip("'\"").rstrip("/")
 CONTENT_SAFETY_KEY = os.getenv("CONTENT_SAFETY_KEY", "").strip().strip("'\"").rstrip("/")
-
-blob_service_client = BlobServiceClient.from_connection_string(AZURE_CONNECTION_STRING)
-
-def get_or_create_container():
-    container_name = "user"
-    container_client = blob_service_client.get_container_client(container_name)
-    try:
-        container_client.get_container_properties()
-    except Exception:
-        container_client = blob_service_client.create_container(container_name)
-    return container_client
+# Set to false to skip the Content Safety call (offline runs / benchmarks on the local backend)
+CONTENT_SAFETY_ENABLED = os.getenv("CONTENT_SAFETY_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Per-stage limits for the multi-file image upload pipeline (shared by all requests in the process)
+UPLOAD_SAFETY_CONCURRENCY = int(os.getenv("UPLOAD_SAFETY_CONCURRENCY", "4"))
+UPLOAD_STORAGE_CONCURRENCY = int(os.getenv("UPLOAD_STORAGE_CONCURRENCY", "8"))
+
+_safety_slots = asyncio.Semaphore(UPLOAD_SAFETY_CONCURRENCY)
+_storage_slots = asyncio.Semaphore(UPLOAD_STORAGE_CONCURRENCY)
+
+# Direct-to-storage upload sessions: URL lifetime and per-category size limits (checked on completion)
+UPLOAD_SESSION_EXPIRY_MINUTES = int(os.getenv("UPLOAD_SESSION_EXPIRY_MINUTES", "15"))
+UPLOAD_SESSION_MAX_BYTES = {
+    "images": int(os.getenv("IMAGE_UPLOAD_MAX_BYTES", str(50 * 1024 * 1024))),
+    "outputs": int(os.getenv("OUTPUT_UPLOAD_MAX_BYTES", str(200 * 1024 * 1024))),
+    "texts": int(os.getenv("TEXT_UPLOAD_MAX_BYTES", str(1024 * 1024))),
+}
+
+# Per-user magazine folder list; dropped when a write lands in a folder the cached list lacks.
+# The TTL bounds staleness for writes handled by other workers.
+folder_cache = TTLLRUCache(
+    int(os.getenv("FOLDER_CACHE_MAX_BYTES", str(1024 * 1024))), float(os.getenv("FOLDER_CACHE_TTL", "300"))
+)
+
+# Blob store selected by STORAGE_BACKEND (azure | local); opened on app startup, closed on shutdown
+storage = create_storage_backend()
+# Shared Content Safety client + sha256-keyed result cache; closed on shutdown
+safety_checker = create_safety_checker(CONTENT_SAFETY_ENDPOINT, CONTENT_SAFETY_KEY)
 
 def build_blob_path(user_id: str, magazine_id: str, category: str, filename: str) -> str:
     return f"{user_id}/magazine/{magazine_id}/{category}/{filename}"
 
 
-def upload_image_if_not_exists(user_id: str, magazine_id: str, filename: str, content: bytes) -> tuple[bool, str]:
-    """
-    Upload image with processing, safety check, and sequential naming.
-    Returns (uploaded, final_filename)
-    """
-    # Check file extension
+VARIANT_CONTENT_TYPES = {"jpg": "image/jpeg", "webp": "image/webp"}
+
+
+def variant_filename(filename: str, size: int, ext: str) -> str:
+    """image3.jpg -> variants/image3_w256.webp (stored under the same images/ folder)"""
+    return f"variants/{Path(filename).stem}_w{size}.{ext}"
+
+
+async def put_image_variants(user_id: str, magazine_id: str, filename: str, variants: dict[tuple[int, str], bytes]):
+    await asyncio.gather(*(
+        storage.put(
+            build_blob_path(user_id, magazine_id, "images", variant_filename(filename, size, ext)),
+            data, content_type=VARIANT_CONTENT_TYPES[ext], overwrite=True
+        )
+        for (size, ext), data in variants.items()
+    ))
+    mark_magazine_written(user_id, magazine_id)
+
+
+async def _prepare_image(filename: str, content: bytes) -> tuple[bytes, dict[tuple[int, str], bytes]]:
+    """Validation, safety check and re-encode for one file; raises ValueError when the file is rejected"""
     if not is_supported_image_format(filename):
         raise ValueError(f"Unsupported image format: {filename}")
-    
-    # Check content safety first (with original content)
-    is_safe, safety_result = is_image_safe_for_upload(content, filename)
+
+    async with _safety_slots:
+        is_safe, safety_result = await is_image_safe_for_upload(content, filename)
     if not is_safe:
         raise ValueError(f"Image failed content safety check: {safety_result}")
-    
-    # Process image (convert to RGB, apply EXIF rotation)
-    processed_content = process_image_bytes(content)
-    
-    # Generate sequential filename
-    new_filename = get_next_image_name(user_id, magazine_id)
-    
-    # Upload processed image
-    container_client = get_or_create_container()
-    blob_path = build_blob_path(user_id, magazine_id, "images", new_filename)
-    blob_client = container_client.get_blob_client(blob_path)
-    
-    blob_client.upload_blob(
-        processed_content, 
-        overwrite=False,
-        content_settings=ContentSettings(content_type="image/jpeg")
+
+    # Bounded by IMAGE_PROCESS_WORKERS inside the process pool
+    return await process_image_and_variants(content)
+
+
+async def _put_image(user_id: str, magazine_id: str, filename: str,
+                     prepared: tuple[bytes, dict[tuple[int, str], bytes]]):
+    content, variants = prepared
+    async with _storage_slots:
+        # Original first: if the name is already taken this fails before any variant
+        # of the existing image is overwritten
+        blob_path = build_blob_path(user_id, magazine_id, "images", filename)
+        await storage.put(blob_path, content, content_type="image/jpeg", overwrite=False)
+        await put_image_variants(user_id, magazine_id, filename, variants)
+
+
+def _skip_reason(error: BaseException) -> str:
+    if isinstance(error, ValueError):
+        return str(error)
+    return f"Upload error: {str(error)}"
+
+
+async def upload_images(db: AsyncSession, user_id: str, magazine_id: str,
+                        files: list[tuple[str, bytes]]) -> tuple[list[dict], list[dict]]:
+    """
+    Upload several images at once.
+    Each file runs its own safety check -> processing -> blob upload pipeline (bounded per stage),
+    so early files are stored (and their bytes released) while later ones are still being processed.
+    Files that pass are named imageN.jpg in submission order: a file takes the next number from a
+    block reserved up front only after every earlier file has taken one or been rejected, and the
+    unused tail of the block is handed back at the end.
+    Returns (uploaded, skipped) in submission order.
+    """
+    if not files:
+        return [], []
+    first = await allocate_asset_sequence(db, user_id, magazine_id, "images", count=len(files))
+    next_number = first
+    loop = asyncio.get_running_loop()
+    named = [loop.create_future() for _ in files]
+
+    async def pipeline(i: int, filename: str, content: bytes) -> tuple[str, int, str]:
+        nonlocal next_number
+        try:
+            prepared = await _prepare_image(filename, content)
+        except Exception as e:
+            prepared = e
+        if i:
+            await named[i - 1]
+        if isinstance(prepared, Exception):
+            named[i].set_result(None)
+            raise prepared
+        name = f"image{next_number}.jpg"
+        next_number += 1
+        named[i].set_result(None)
+        await _put_image(user_id, magazine_id, name, prepared)
+        processed = prepared[0]
+        return name, len(processed), hashlib.sha256(processed).hexdigest()
+
+    results = await asyncio.gather(
+        *(pipeline(i, filename, content) for i, (filename, content) in enumerate(files)),
+        return_exceptions=True
     )
-    
-    return True, new_filename
+    unused = first + len(files) - next_number
+    if unused:
+        await release_asset_sequence(db, user_id, magazine_id, "images", first + len(files) - 1, unused)
+
+    uploaded = []
+    skipped = []
+    for (filename, _), result in zip(files, results):
+        if isinstance(result, BaseException):
+            skipped.append({"filename": filename, "reason": _skip_reason(result)})
+            continue
+        name, size, sha256 = result
+        await register_asset(db, user_id, magazine_id, "images", name, size=size, sha256=sha256)
+        uploaded.append({"original_filename": filename, "stored_filename": name})
+    return uploaded, skipped
 # def upload_image_if_not_exists(user_id: str, magazine_id: str, filename: str, content: bytes) -> bool:
 #     container_client = get_or_create_container()
 #     blob_path = build_blob_path(user_id, magazine_id, "images", filename)
@@ -82,102 +180,86 @@ def upload_image_if_not_exists(user_id: str, magazine_id: str, filename: str, co
 #     blob_client.upload_blob(content, overwrite=False)
 #     return True
 
-def delete_image(user_id: str, magazine_id: str, filename: str):
-    container_client = get_or_create_container()
+async def delete_image(db: AsyncSession, user_id: str, magazine_id: str, filename: str):
     blob_path = build_blob_path(user_id, magazine_id, "images", filename)
-    blob_client = container_client.get_blob_client(blob_path)
-    blob_client.delete_blob()
+    try:
+        await storage.delete(blob_path)
+    except BlobNotFoundError:
+        # Blob already gone: drop the stale manifest entry and variants too, then report it.
+        # Any other storage error propagates with the manifest entry intact.
+        await _remove_image_entry(db, user_id, magazine_id, filename)
+        raise
+    await _remove_image_entry(db, user_id, magazine_id, filename)
+
+async def _remove_image_entry(db: AsyncSession, user_id: str, magazine_id: str, filename: str):
+    await remove_asset(db, user_id, magazine_id, "images", filename)
+    await asyncio.gather(*(
+        _delete_if_exists(build_blob_path(user_id, magazine_id, "images", variant_filename(filename, size, ext)))
+        for size in IMAGE_VARIANT_SIZES for ext in IMAGE_VARIANT_FORMATS
+    ))
 
-def list_images(user_id: str, magazine_id: str):
-    container_client = get_or_create_container()
-    prefix = f"{user_id}/magazine/{magazine_id}/images/"
-    return [blob.name[len(prefix):] for blob in container_client.list_blobs(name_starts_with=prefix)]
+async def _delete_if_exists(blob_path: str):
+    try:
+        await storage.delete(blob_path)
+    except BlobNotFoundError:
+        pass
+
+async def list_images(db: AsyncSession, user_id: str, magazine_id: str):
+    return await list_asset_names(db, user_id, magazine_id, "images")
+
+def image_variant_urls(user_id: str, magazine_id: str, filenames: list[str], size: int) -> list[dict[str, str]]:
+    """SAS URLs of one resized variant per image, keyed by extension (jpg / webp)"""
+    urls = generate_blob_sas_urls(
+        user_id, magazine_id, "images",
+        [variant_filename(filename, size, ext) for filename in filenames for ext in IMAGE_VARIANT_FORMATS]
+    )
+    per_image = len(IMAGE_VARIANT_FORMATS)
+    return [
+        dict(zip(IMAGE_VARIANT_FORMATS, urls[i * per_image:(i + 1) * per_image]))
+        for i in range(len(filenames))
+    ]
 
 def generate_blob_sas_url(user_id: str, magazine_id: str, category: str, filename: str, expiry_minutes: int = 30) -> str:
     blob_path = build_blob_path(user_id, magazine_id, category, filename)
-    sas_token = generate_blob_sas(
-        account_name=AZURE_STORAGE_ACCOUNT_NAME,
-        container_name="user",
-        blob_name=blob_path,
-        account_key=AZURE_STORAGE_ACCOUNT_KEY,
-        permission=BlobSasPermissions(read=True),
-        expiry=datetime.now(timezone.utc) + timedelta(minutes=expiry_minutes)
+    return storage.sign_url(blob_path, expiry_minutes)
+
+def generate_blob_sas_urls(user_id: str, magazine_id: str, category: str, filenames: list[str],
+                           expiry_minutes: int = 30) -> list[str]:
+    """generate_blob_sas_url for a whole listing (memoized, same expiry for every URL)"""
+    return storage.sign_urls(
+        [build_blob_path(user_id, magazine_id, category, filename) for filename in filenames], expiry_minutes
     )
-    return f"https://{AZURE_STORAGE_ACCOUNT_NAME}.blob.core.windows.net/user/{blob_path}?{sas_token}"
 
 
-def list_output_files(user_id: str, magazine_id: str):
-    container_client = get_or_create_container()
-    prefix = f"{user_id}/magazine/{magazine_id}/outputs/"
-    return [blob.name[len(prefix):] for blob in container_client.list_blobs(name_starts_with=prefix)]
+async def list_output_files(db: AsyncSession, user_id: str, magazine_id: str):
+    return await list_asset_names(db, user_id, magazine_id, "outputs")
+
+async def upload_output_file(db: AsyncSession, user_id: str, magazine_id: str, filename: str,
+                             chunks: AsyncIterator[bytes]):
+    """Stream chunks into the outputs folder (staged blocks on Azure), hashing them on the way"""
+    digest = hashlib.sha256()
+
+    async def hashed_chunks():
+        async for chunk in chunks:
+            digest.update(chunk)
+            yield chunk
 
-def upload_output_file(user_id: str, magazine_id: str, filename: str, content: bytes):
-    container_client = get_or_create_container()
     blob_path = build_blob_path(user_id, magazine_id, "outputs", filename)
-    blob_client = container_client.get_blob_client(blob_path)
-    blob_client.upload_blob(content, overwrite=True)
+    size = await storage.put_stream(blob_path, hashed_chunks(), overwrite=True)
+    mark_magazine_written(user_id, magazine_id)
+    await register_asset(
+        db, user_id, magazine_id, "outputs", filename,
+        size=size, sha256=digest.hexdigest()
+    )
 
 
-def analyze_image_from_blob(image_content: bytes, filename: str = "") -> dict:
+async def analyze_image_from_blob(image_content: bytes, filename: str = "") -> dict:
     """
     Analyze image content using Azure Content Safety API.
     Returns result dict including 'should_filter' flag and per-category analysis.
+    Results are cached by the SHA-256 of the image bytes.
     """
-    if not CONTENT_SAFETY_ENDPOINT or not CONTENT_SAFETY_KEY:
-        raise ValueError("Content Safety endpoint and key must be configured")
-    
-    print(f"Using Content Safety endpoint: {CONTENT_SAFETY_ENDPOINT}")
-    print(f"Content Safety key configured: {'Yes' if CONTENT_SAFETY_KEY else 'No'}")
-    
-    client = ContentSafetyClient(
-        endpoint=CONTENT_SAFETY_ENDPOINT,
-        credential=AzureKeyCredential(CONTENT_SAFETY_KEY)
-    )
-
-    # Create the request with proper image data
-    image_data = ImageData(content=image_content)
-    request = AnalyzeImageOptions(image=image_data)
-
-    try:
-        print(f"Analyzing image: {filename} ({len(image_content)} bytes)")
-        response = client.analyze_image(request)
-        print(f"Analysis successful for {filename}")
-    except HttpResponseError as e:
-        print(f"Content Safety API error for {filename}: {e}")
-        print(f"Status code: {e.status_code}")
-        print(f"Error code: {e.error.code if hasattr(e, 'error') and e.error else 'Unknown'}")
-        print(f"Error message: {e.error.message if hasattr(e, 'error') and e.error else str(e)}")
-        raise
-    except Exception as e:
-        print(f"Unexpected error analyzing {filename}: {e}")
-        raise
-
-    results = {
-        "filename": filename,
-        "image_size": len(image_content),
-        "analysis": {},
-        "should_filter": False
-    }
-
-    categories = [
-        ("hate", ImageCategory.HATE),
-        ("self_harm", ImageCategory.SELF_HARM),
-        ("sexual", ImageCategory.SEXUAL),
-        ("violence", ImageCategory.VIOLENCE)
-    ]
-
-    for name, cat_enum in categories:
-        cat_result = next((c for c in response.categories_analysis if c.category == cat_enum), None)
-        severity = cat_result.severity if cat_result else 0
-        filtered = severity > 2
-        results["analysis"][name] = {
-            "severity": severity,
-            "filtered": filtered
-        }
-        if filtered:
-            results["should_filter"] = True
-
-    return results
+    return await safety_checker.analyze(image_content, filename)
 # def analyze_image_from_blob(image_content: bytes, filename: str = "") -> dict:
 #     """
 #     Analyze image content using Azure Content Safety API.
@@ -223,57 +305,54 @@ def analyze_image_from_blob(image_content: bytes, filename: str = "") -> dict:
 
 #     return results
 
-def is_image_safe_for_upload(image_bytes: bytes, filename: str = "") -> tuple[bool, dict]:
+async def is_image_safe_for_upload(image_bytes: bytes, filename: str = "") -> tuple[bool, dict]:
+    if not CONTENT_SAFETY_ENABLED:
+        return True, {"filename": filename, "skipped": True}
     try:
-        result = analyze_image_from_blob(image_bytes, filename)
+        result = await analyze_image_from_blob(image_bytes, filename)
         return not result["should_filter"], result
     except Exception as e:
         return False, {"error": str(e)}
 
 
-def upload_profile_image(user_id: str, content: bytes, filename: str = "profile_image.jpg") -> str:
+async def upload_profile_image(user_id: str, content: bytes, filename: str = "profile_image.jpg") -> str:
     """
     Uploads the user's profile image to Azure Blob Storage and returns the blob URL.
     """
-    container_client = get_or_create_container()
     blob_path = f"{user_id}/profile/image/{filename}"
-    blob_client = container_client.get_blob_client(blob_path)
-    blob_client.upload_blob(content, overwrite=True)
-
-    sas_token = generate_blob_sas(
-        account_name=AZURE_STORAGE_ACCOUNT_NAME,
-        container_name="user",
-        blob_name=blob_path,
-        account_key=AZURE_STORAGE_ACCOUNT_KEY,
-        permission=BlobSasPermissions(read=True),
-        expiry=datetime.now(timezone.utc) + timedelta(hours=1)
-    )
-
-    return f"https://{AZURE_STORAGE_ACCOUNT_NAME}.blob.core.windows.net/user/{blob_path}?{sas_token}"
+    await storage.put(blob_path, content, overwrite=True)
+    return storage.sign_url(blob_path, expiry_minutes=60)
 
-def upload_interview_result(user_id: str, magazine_id: str, content: bytes):
-    container_client = get_or_create_container()
+async def upload_interview_result(db: AsyncSession, user_id: str, magazine_id: str, content: bytes):
     
     # Generate date-based filename
     current_date = datetime.now()
     base_filename = f"interview_{current_date.month:02d}-{current_date.day:02d}"
     
-    # Check for existing files and add counter if needed
+    # Check existing names in the manifest and add counter if needed
+    existing = set(await list_asset_names(db, user_id, magazine_id, "texts"))
     counter = 1
     final_filename = f"{base_filename}.txt"
     
     while True:
-        blob_path = build_blob_path(user_id, magazine_id, "texts", final_filename)
-        blob_client = container_client.get_blob_client(blob_path)
-        
-        if not blob_client.exists():
-            break
+        if final_filename not in existing:
+            blob_path = build_blob_path(user_id, magazine_id, "texts", final_filename)
+            try:
+                # overwrite=False so a concurrent upload of the same name makes us move on
+                await storage.put(blob_path, content, content_type="text/plain", overwrite=False)
+                break
+            except BlobExistsError:
+                pass
         
         # File exists, try next number
         final_filename = f"{base_filename}_{counter}.txt"
         counter += 1
     
-    blob_client.upload_blob(content, overwrite=True, content_settings=ContentSettings(content_type="text/plain"))
+    mark_magazine_written(user_id, magazine_id)
+    await register_asset(
+        db, user_id, magazine_id, "texts", final_filename,
+        size=len(content), sha256=hashlib.sha256(content).hexdigest()
+    )
     return blob_path
 
 # def upload_interview_result(user_id: str, folder_name: str, content: str) -> str:
@@ -336,9 +415,21 @@ def upload_interview_result(user_id: str, magazine_id: str, content: bytes):
 #         logger.error(f"인터뷰 결과 업로드 실패: {str(e)}")
 #         raise Exception(f"Azure Storage 업로드 실패: {str(e)}")
 
-def list_user_folders(user_id: str) -> list:
+def _folder_cache_key(user_id: str) -> str:
+    return f"folders:{user_id}"
+
+
+def mark_magazine_written(user_id: str, magazine_id: str):
+    """Call after writing into a magazine folder; drops the cached folder list if the folder is new to it."""
+    cached = folder_cache.get(_folder_cache_key(user_id))
+    if cached is not None and magazine_id not in cached:
+        folder_cache.delete(_folder_cache_key(user_id))
+
+
+async def list_user_folders(user_id: str) -> list:
     """
     특정 사용자의 magazine 폴더 목록을 반환합니다.
+    {user_id}/magazine/ 바로 아래 단계만 조회 (delimiter 기반, 폴더 속 파일은 나열하지 않음)
     
     Args:
         user_id: 사용자 ID
@@ -347,22 +438,14 @@ def list_user_folders(user_id: str) -> list:
         list: 폴더명 목록
     """
     try:
-        container_client = get_or_create_container()
-        prefix = f"{user_id}/magazine/"
-        
-        folders = set()
-        blobs = container_client.list_blobs(name_starts_with=prefix)
-        
-        for blob in blobs:
-            # magazine/ 다음 부분을 추출
-            relative_path = blob.name[len(prefix):]
-            if '/' in relative_path:
-                folder_name = relative_path.split('/')[0]
-                folders.add(folder_name)
-        
-        folder_list = sorted(list(folders))
+        cached = folder_cache.get(_folder_cache_key(user_id))
+        if cached is not None:
+            return list(cached)
+
+        folder_list = await storage.list_prefixes(f"{user_id}/magazine/")
+        folder_cache.set(_folder_cache_key(user_id), folder_list)
         #logger.info(f"사용자 {user_id}의 폴더 목록: {folder_list}")
-        return folder_list
+        return list(folder_list)
 
        
     #except Exception as e:
@@ -370,44 +453,19 @@ def list_user_folders(user_id: str) -> list:
     except Exception:
         return []
 
-def delete_interview_result(user_id: str, magazine_id: str, filename: str):
+async def delete_interview_result(db: AsyncSession, user_id: str, magazine_id: str, filename: str):
     """Delete a stored interview result file."""
-    container_client = get_or_create_container()
     blob_path = build_blob_path(user_id, magazine_id, "texts", filename)
-    blob_client = container_client.get_blob_client(blob_path)
-    blob_client.delete_blob()
-
-def list_text_files(user_id: str, magazine_id: str):
-    container_client = get_or_create_container()
-    prefix = f"{user_id}/magazine/{magazine_id}/texts/"
-    return [blob.name[len(prefix):] for blob in container_client.list_blobs(name_starts_with=prefix)]
-
+    try:
+        await storage.delete(blob_path)
+    except BlobNotFoundError:
+        # Blob already gone: drop the stale manifest entry, then report it
+        await remove_asset(db, user_id, magazine_id, "texts", filename)
+        raise
+    await remove_asset(db, user_id, magazine_id, "texts", filename)
 
-def process_image_bytes(image_bytes: bytes) -> bytes:
-    """
-    Process image bytes: apply EXIF rotation and convert to RGB
-    Returns processed image as JPEG bytes
-    """
-    # Open image directly from bytes
-    img = Image.open(io.BytesIO(image_bytes))
-    
-    # Apply EXIF rotation
-    img = ImageOps.exif_transpose(img)
-    
-    # Convert to RGB (JPEG doesn't support RGBA)
-    if img.mode in ('RGBA', 'LA', 'P'):
-        background = Image.new('RGB', img.size, (255, 255, 255))
-        if img.mode == 'P':
-            img = img.convert('RGBA')
-        background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-        img = background
-    elif img.mode != 'RGB':
-        img = img.convert('RGB')
-    
-    # Convert back to bytes
-    output_buffer = io.BytesIO()
-    img.save(output_buffer, format='JPEG', quality=95, optimize=True)
-    return output_buffer.getvalue()
+async def list_text_files(db: AsyncSession, user_id: str, magazine_id: str):
+    return await list_asset_names(db, user_id, magazine_id, "texts")
 
 
 def is_supported_image_format(filename: str) -> bool:
@@ -416,24 +474,165 @@ def is_supported_image_format(filename: str) -> bool:
     return Path(filename).suffix.lower() in supported_extensions
 
 
-def get_next_image_name(user_id: str, magazine_id: str) -> str:
-    """Generate next sequential image name (image1.jpg, image2.jpg, etc.)"""
-    container_client = get_or_create_container()
-    prefix = f"{user_id}/magazine/{magazine_id}/images/"
-    
-    existing_blobs = list(container_client.list_blobs(name_starts_with=prefix))
-    existing_numbers = []
-    
-    for blob in existing_blobs:
-        filename = blob.name[len(prefix):]
-        if filename.startswith('image') and filename.endswith('.jpg'):
-            try:
-                number_str = filename[5:-4]  # Remove "image" and ".jpg"
-                existing_numbers.append(int(number_str))
-            except ValueError:
-                continue
-    
-    next_number = max(existing_numbers) + 1 if existing_numbers else 1
-    return f"image{next_number}.jpg"
+def parse_image_number(filename: str) -> int | None:
+    """image12.jpg -> 12 (None for other names)"""
+    if filename.startswith('image') and filename.endswith('.jpg'):
+        try:
+            return int(filename[5:-4])  # Remove "image" and ".jpg"
+        except ValueError:
+            return None
+    return None
 
 
+async def backfill_asset_manifest(db: AsyncSession) -> int:
+    """
+    Register blobs that predate the manifest (one full listing of the container)
+    and move each magazine's image counter past its highest existing imageN.jpg.
+    Returns the number of blobs scanned.
+    """
+    registered = 0
+    max_numbers: dict[tuple[str, str], int] = {}
+    for blob_name in await storage.list_names(""):
+        parts = blob_name.split("/")
+        if len(parts) != 5 or parts[1] != "magazine" or parts[3] not in ("images", "texts", "outputs"):
+            continue
+        user_id, _, magazine_id, category, filename = parts
+        await register_asset(
+            db, user_id, magazine_id, category, filename,
+            size=await storage.size(blob_name), overwrite=False
+        )
+        registered += 1
+        number = parse_image_number(filename) if category == "images" else None
+        if number:
+            key = (user_id, magazine_id)
+            max_numbers[key] = max(max_numbers.get(key, 0), number)
+
+    for (user_id, magazine_id), number in max_numbers.items():
+        await raise_asset_sequence(db, user_id, magazine_id, "images", number)
+    return registered
+
+
+async def backfill_image_variants(db: AsyncSession) -> tuple[int, int]:
+    """
+    Generate resized variants for manifest images that do not have them yet.
+    Returns (generated, skipped).
+    """
+    generated = 0
+    skipped = 0
+    for user_id, magazine_id, filename in await list_all_asset_names(db, "images"):
+        largest = variant_filename(filename, max(IMAGE_VARIANT_SIZES), IMAGE_VARIANT_FORMATS[-1])
+        if await storage.exists(build_blob_path(user_id, magazine_id, "images", largest)):
+            skipped += 1
+            continue
+        try:
+            content = await storage.get(build_blob_path(user_id, magazine_id, "images", filename))
+            variants = await make_image_variants(content)
+        except (BlobNotFoundError, ValueError) as e:
+            print(f"skip {user_id}/{magazine_id}/{filename}: {e}")
+            skipped += 1
+            continue
+        await put_image_variants(user_id, magazine_id, filename, variants)
+        generated += 1
+    return generated, skipped
+
+
+# ---------------------------------------------------
+# Direct-to-storage uploads
+# The client PUTs the bytes to a write-only signed URL, then calls complete_upload_session.
+# Every upload goes to an incoming/ staging blob first, so a client that never completes cannot
+# touch registered files: images are named imageN.jpg only after the safety check and re-encode,
+# outputs / texts are copied to their final name only after validation.
+# ---------------------------------------------------
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}(\.[a-z0-9]{1,5})?$")
+# outputs / texts: <32 hex>_<final filename>
+_NAMED_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}_(.+)$")
+
+
+def _check_plain_filename(filename: str):
+    if not filename or "/" in filename or "\\" in filename or filename in (".", "..") or filename.startswith("."):
+        raise ValueError(f"Invalid filename: {filename}")
+
+
+def _upload_target(category: str, upload_id: str) -> str | None:
+    """Final filename an upload id resolves to (None for images, which are named on completion)"""
+    if category not in UPLOAD_SESSION_MAX_BYTES:
+        raise ValueError(f"Unsupported category: {category}")
+    if category == "images":
+        if not _UPLOAD_ID_RE.match(upload_id):
+            raise ValueError(f"Invalid upload id: {upload_id}")
+        return None
+    match = _NAMED_UPLOAD_ID_RE.match(upload_id)
+    if not match:
+        raise ValueError(f"Invalid upload id: {upload_id}")
+    filename = match.group(1)
+    _check_plain_filename(filename)
+    if category == "texts" and not filename.endswith(".txt"):
+        raise ValueError("Text uploads must be .txt files")
+    return filename
+
+
+def upload_session_path(user_id: str, magazine_id: str, category: str, upload_id: str) -> str:
+    """Staging blob of an upload session"""
+    _check_plain_filename(magazine_id)
+    _upload_target(category, upload_id)
+    return build_blob_path(user_id, magazine_id, "incoming", upload_id)
+
+
+def create_upload_session(user_id: str, magazine_id: str, category: str, filename: str) -> dict:
+    """Issue a short-lived write-only URL for one staging blob."""
+    if category == "images":
+        if not is_supported_image_format(filename):
+            raise ValueError(f"Unsupported image format: {filename}")
+        upload_id = f"{uuid.uuid4().hex}{Path(filename).suffix.lower()}"
+    else:
+        upload_id = f"{uuid.uuid4().hex}_{filename}"
+    blob_path = upload_session_path(user_id, magazine_id, category, upload_id)
+    upload_url, headers = storage.sign_upload_url(blob_path, UPLOAD_SESSION_EXPIRY_MINUTES)
+    return {
+        "upload_id": upload_id,
+        "category": category,
+        "upload_url": upload_url,
+        "method": "PUT",
+        "headers": headers,
+        "max_bytes": UPLOAD_SESSION_MAX_BYTES[category],
+        "expires_in": UPLOAD_SESSION_EXPIRY_MINUTES * 60,
+    }
+
+
+async def complete_upload_session(db: AsyncSession, user_id: str, magazine_id: str, category: str,
+                                  upload_id: str) -> dict:
+    """
+    Validate an uploaded staging blob, move it into place and register it.
+    Raises BlobNotFoundError if nothing was uploaded, ValueError if the blob is rejected.
+    The staging blob is removed either way; registered files are only written after validation.
+    """
+    staging_path = upload_session_path(user_id, magazine_id, category, upload_id)
+    filename = _upload_target(category, upload_id)
+    try:
+        size = await storage.size(staging_path)
+        if size > UPLOAD_SESSION_MAX_BYTES[category]:
+            raise ValueError(f"File too large (max {UPLOAD_SESSION_MAX_BYTES[category] // (1024 * 1024)}MB)")
+
+        if category == "images":
+            content = await storage.get(staging_path)
+            uploaded, skipped = await upload_images(db, user_id, magazine_id, [(upload_id, content)])
+            if skipped:
+                raise ValueError(skipped[0]["reason"])
+            return {"filename": uploaded[0]["stored_filename"], "size": size}
+
+        if category == "texts":
+            content = await storage.get(staging_path)
+            try:
+                content.decode("utf-8")
+            except UnicodeDecodeError:
+                raise ValueError("Text uploads must be UTF-8")
+            sha256 = hashlib.sha256(content).hexdigest()
+        else:
+            # outputs can be large; the manifest keeps size only
+            sha256 = None
+        await storage.copy(staging_path, build_blob_path(user_id, magazine_id, category, filename))
+        await register_asset(db, user_id, magazine_id, category, filename, size=size, sha256=sha256)
+        mark_magazine_written(user_id, magazine_id)
+        return {"filename": filename, "size": size}
+    finally:
+        await _delete_if_exists(staging_path)
@@ -0,0 +1,188 @@
+import json
+import os
+import time
+from collections import OrderedDict
+
+# 응답 캐시 설정 (RESPONSE_CACHE_MAX_BYTES=0 이면 캐시 비활성화)
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+
+
+class CacheBackend:
+    """응답 캐시 인터페이스. 다른 저장소(Redis 등)를 쓰려면 이 메서드들을 구현하면 됩니다."""
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def set(self, key: str, value):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class NullCache(CacheBackend):
+    """캐시 비활성화용: 항상 miss"""
+
+    def get(self, key: str):
+        return None
+
+    def set(self, key: str, value):
+        pass
+
+    def delete(self, key: str):
+        pass
+
+    def delete_prefix(self, prefix: str):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"enabled": False}
+
+
+class TTLLRUCache(CacheBackend):
+    """
+    프로세스 내 TTL + LRU 캐시. 항목 수가 아니라 JSON 직렬화 크기(bytes) 합계로 용량을 제한합니다.
+    값은 JSON 직렬화 가능한 객체이며, 호출 측에서 수정하지 않는다고 가정합니다.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, int, object]] = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, _, value = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value):
+        size = len(key) + len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        while self._entries and self.current_bytes + size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self.current_bytes += size
+
+    def delete(self, key: str):
+        if key in self._entries:
+            self._remove(key)
+            self.invalidations += 1
+
+    def delete_prefix(self, prefix: str):
+        for key in [k for k in self._entries if k.startswith(prefix)]:
+            self.delete(key)
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+def build_response_cache() -> CacheBackend:
+    if RESPONSE_CACHE_MAX_BYTES <= 0:
+        return NullCache()
+    return TTLLRUCache(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL)
+
+
+response_cache = build_response_cache()
+
+
+# 캐시 키 규칙
+ARTICLE_LIST_PREFIX = "articles:list"
+
+
+def article_list_key(cursor: str | None = None, limit: int | None = None) -> str:
+    return f"{ARTICLE_LIST_PREFIX}:{cursor or ''}:{limit or ''}"
+
+
+def article_detail_key(article_id: str) -> str:
+    return f"articles:detail:{article_id}"
+
+
+def get_versioned(key: str, version: str):
+    """version 이 같은 항목만 반환. 다른 워커의 쓰기나 복제 지연으로 버전이 바뀌었으면 miss 로 처리"""
+    entry = response_cache.get(key)
+    if entry is None:
+        return None
+    if entry["version"] != version:
+        response_cache.delete(key)
+        return None
+    return entry["value"]
+
+
+def set_versioned(key: str, version: str, value):
+    response_cache.set(key, {"version": version, "value": value})
+
+
+def add_article_views(deltas: dict[str, int]):
+    """
+    반영된 조회수를 캐시된 상세 응답에 더함 (버전은 유지).
+    상세 버전에는 view_count 가 없으므로, 이렇게 하지 않으면 flush 후 pending 이 비면서 조회수가 줄어 보임
+    """
+    for article_id, delta in deltas.items():
+        key = article_detail_key(article_id)
+        entry = response_cache.get(key)
+        if entry is not None:
+            value = {**entry["value"], "view_count": entry["value"]["view_count"] + delta}
+            set_versioned(key, entry["version"], value)
+
+
+def invalidate_article_list():
+    response_cache.delete_prefix(ARTICLE_LIST_PREFIX)
+
+
+def invalidate_article(article_id: str):
+    response_cache.delete(article_detail_key(article_id))
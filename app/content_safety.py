@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from azure.ai.contentsafety.aio import ContentSafetyClient
+from azure.ai.contentsafety.models import AnalyzeImageOptions, ImageData, ImageCategory
+from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError
+
+from app.cache import CacheBackend, NullCache, TTLLRUCache
+
+SEVERITY_THRESHOLD = 2
+CATEGORIES = [
+    ("hate", ImageCategory.HATE),
+    ("self_harm", ImageCategory.SELF_HARM),
+    ("sexual", ImageCategory.SEXUAL),
+    ("violence", ImageCategory.VIOLENCE)
+]
+
+
+class SafetyResultStore:
+    """
+    sha256 -> 분석 결과를 저장하는 로컬 sqlite 파일 (프로세스 재시작 / 워커 간 공유용).
+    sqlite 호출은 블로킹이므로 스레드에서 실행합니다.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS safety_result ("
+            "sha256 TEXT PRIMARY KEY, result TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def _get(self, digest: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, expires_at FROM safety_result WHERE sha256 = ?", (digest,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM safety_result WHERE sha256 = ?", (digest,))
+                return None
+        return json.loads(row[0])
+
+    def _set(self, digest: str, result: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO safety_result (sha256, result, expires_at) VALUES (?, ?, ?)",
+                (digest, json.dumps(result), time.time() + self.ttl)
+            )
+
+    async def get(self, digest: str) -> dict | None:
+        return await asyncio.to_thread(self._get, digest)
+
+    async def set(self, digest: str, result: dict):
+        await asyncio.to_thread(self._set, digest, result)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ContentSafetyChecker:
+    """
+    Azure Content Safety 이미지 분석 + 결과 캐시.
+    같은 이미지(sha256)는 메모리 LRU -> 로컬 저장소 순으로 찾고, 둘 다 없을 때만 API 를 호출합니다.
+    동시에 들어온 같은 이미지는 한 번만 분석합니다.
+    """
+
+    def __init__(self, endpoint: str, key: str, memory: CacheBackend, store: SafetyResultStore | None):
+        self.endpoint = endpoint
+        self.key = key
+        self.memory = memory
+        self.store = store
+        self._client: ContentSafetyClient | None = None
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.lookups = 0
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.api_calls = 0
+        self.api_errors = 0
+        self.api_time = 0.0
+
+    def _get_client(self) -> ContentSafetyClient:
+        if not self.endpoint or not self.key:
+            raise ValueError("Content Safety endpoint and key must be configured")
+        if self._client is None:
+            # 클라이언트 하나를 재사용해 aiohttp 커넥션 풀을 공유
+            self._client = ContentSafetyClient(endpoint=self.endpoint, credential=AzureKeyCredential(self.key))
+        return self._client
+
+    async def _call_api(self, image_content: bytes) -> dict:
+        started = time.perf_counter()
+        self.api_calls += 1
+        try:
+            response = await self._get_client().analyze_image(
+                AnalyzeImageOptions(image=ImageData(content=image_content))
+            )
+        except HttpResponseError as e:
+            self.api_errors += 1
+            print(f"Content Safety API error: {e}")
+            raise
+        finally:
+            self.api_time += time.perf_counter() - started
+
+        results = {"image_size": len(image_content), "analysis": {}, "should_filter": False}
+        for name, cat_enum in CATEGORIES:
+            cat_result = next((c for c in response.categories_analysis if c.category == cat_enum), None)
+            severity = cat_result.severity if cat_result else 0
+            filtered = severity > SEVERITY_THRESHOLD
+            results["analysis"][name] = {"severity": severity, "filtered": filtered}
+            if filtered:
+                results["should_filter"] = True
+        return results
+
+    async def _lookup_or_call(self, digest: str, image_content: bytes) -> dict:
+        if self.store is not None:
+            result = await self.store.get(digest)
+            if result is not None:
+                self.store_hits += 1
+                self.memory.set(digest, result)
+                return result
+        result = await self._call_api(image_content)
+        self.memory.set(digest, result)
+        if self.store is not None:
+            await self.store.set(digest, result)
+        return result
+
+    async def analyze(self, image_content: bytes, filename: str = "") -> dict:
+        """Returns result dict including 'should_filter' flag and per-category analysis."""
+        self.lookups += 1
+        digest = hashlib.sha256(image_content).hexdigest()
+        result = self.memory.get(digest)
+        if result is not None:
+            self.memory_hits += 1
+            return {**result, "filename": filename}
+
+        pending = self._inflight.get(digest)
+        if pending is None:
+            pending = asyncio.ensure_future(self._lookup_or_call(digest, image_content))
+            self._inflight[digest] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(digest, None))
+        result = await asyncio.shield(pending)
+        return {**result, "filename": filename}
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+        if self.store is not None:
+            self.store.close()
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.store_hits
+        return {
+            "lookups": self.lookups,
+            "memory_hits": self.memory_hits,
+            "store_hits": self.store_hits,
+            "hit_rate": round(hits / self.lookups, 4) if self.lookups else 0.0,
+            "api_calls": self.api_calls,
+            "api_errors": self.api_errors,
+            "api_avg_ms": round(self.api_time / self.api_calls * 1000, 1) if self.api_calls else 0.0,
+            "memory": self.memory.stats(),
+            "store": self.store.path if self.store is not None else None,
+        }
+
+
+def create_safety_checker(endpoint: str, key: str) -> ContentSafetyChecker:
+    """
+    CONTENT_SAFETY_CACHE_TTL: 결과 보존 시간 (초, 기본 30일)
+    CONTENT_SAFETY_CACHE_MAX_BYTES: 메모리 LRU 용량 (0 이면 메모리 캐시 비활성화)
+    CONTENT_SAFETY_CACHE_PATH: 로컬 sqlite 파일 경로 (빈 값이면 영구 저장 비활성화)
+    """
+    ttl = float(os.getenv("CONTENT_SAFETY_CACHE_TTL", str(30 * 24 * 3600)))
+    max_bytes = int(os.getenv("CONTENT_SAFETY_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+    path = os.getenv("CONTENT_SAFETY_CACHE_PATH", ".cache/content_safety.sqlite3")
+
+    memory = TTLLRUCache(max_bytes, ttl) if max_bytes > 0 else NullCache()
+    store = SafetyResultStore(path, ttl) if path else None
+    return ContentSafetyChecker(endpoint, key, memory, store)
@@ -1,15 +1,24 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from app.models import User, Article, Comment, Like
+from app.models import User, Article, ArticleLocationCount, Comment, ContentVersion, Like, MagazineAsset, MagazineSequence
+from app.cache import add_article_views, invalidate_article, invalidate_article_list
 from app.schemas import UserCreate, ArticleCreate, ArticleUpdate, CommentCreate, CommentUpdate, DailyCreate, LikeCreate
 from sqlalchemy.orm import selectinload, Session
-from passlib.context import CryptContext
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
+from sqlalchemy import JSON, bindparam, delete, exists, func, literal, tuple_, update
+from datetime import datetime, timedelta
+import base64
+import json
+import os
 import uuid
 
+# content_version 키
+ARTICLES_VERSION = "articles"
+ARTICLE_VIEWS_VERSION = "article_views"
+# 조회수 반영으로 목록 ETag 가 바뀌는 최소 간격 (초). 목록의 view_count 는 이 간격만큼 늦게 보일 수 있음
+ARTICLE_VIEWS_VERSION_INTERVAL = float(os.getenv("ARTICLE_VIEWS_VERSION_INTERVAL", "60"))
 
-# 비밀번호 해시화 설정
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 async def create_user(db: AsyncSession, user: UserCreate):
     # 이미 해시된 비밀번호가 들어오므로, 추가 해싱 없이 바로 저장
@@ -44,6 +53,48 @@ async def create_user(db: AsyncSession, user: UserCreate):
 #     return db_article
 
 
+############# 나라/도시별 게시글 수 집계 #################
+
+async def adjust_location_count(db: AsyncSession, country: str | None, city: str | None, delta: int):
+    """집계 테이블의 (country, city) 카운트를 delta 만큼 증감 (commit 은 호출 측 트랜잭션에서)"""
+    stmt = pg_insert(ArticleLocationCount).values(
+        travelCountry=country or "", travelCity=city or "", count=delta
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ArticleLocationCount.travelCountry, ArticleLocationCount.travelCity],
+            set_={"count": ArticleLocationCount.count + delta}
+        )
+    )
+
+async def remove_author_location_counts(db: AsyncSession, user_id: str):
+    """작성자의 글을 일괄 삭제하기 전에 집계에서 해당 글들을 빼줍니다."""
+    result = await db.execute(
+        select(Article.travelCountry, Article.travelCity, func.count(Article.articleID))
+        .where(Article.articleAuthor == user_id)
+        .group_by(Article.travelCountry, Article.travelCity)
+    )
+    for country, city, count in result.all():
+        await adjust_location_count(db, country, city, -count)
+
+async def rebuild_location_counts(db: AsyncSession) -> int:
+    """article 테이블 전체를 다시 집계해서 집계 테이블을 재구성합니다. 반환값은 (country, city) 행 수"""
+    await db.execute(delete(ArticleLocationCount))
+    country = func.coalesce(Article.travelCountry, "")
+    city = func.coalesce(Article.travelCity, "")
+    result = await db.execute(
+        select(country, city, func.count(Article.articleID)).group_by(country, city)
+    )
+    rows = [
+        {"travelCountry": country, "travelCity": city, "count": count}
+        for country, city, count in result.all()
+    ]
+    if rows:
+        await db.execute(pg_insert(ArticleLocationCount), rows)
+    await db.commit()
+    return len(rows)
+
+
 # (기존 create_article은 동기 세션을 썼지만, 여기서는 AsyncSession 으로 통일)
 async def create_article(db: AsyncSession, article: ArticleCreate):
     db_article = Article(
@@ -58,7 +109,10 @@ async def create_article(db: AsyncSession, article: ArticleCreate):
         price=article.price
     )
     db.add(db_article)
+    await adjust_location_count(db, db_article.travelCountry, db_article.travelCity, 1)
+    await bump_content_version(db, ARTICLES_VERSION)
     await db.commit()
+    invalidate_article_list()
     await db.refresh(db_article)
     return db_article
 
@@ -72,11 +126,21 @@ async def update_article(db: AsyncSession, article_id: str, article: ArticleUpda
     # 2) 전달된 변경값만 덮어쓰기
     #update_data = article.dict(exclude_unset=True)
     update_data = article.dict(exclude_unset=True, exclude_none=True)
+    old_location = (db_article.travelCountry, db_article.travelCity)
     for key, value in update_data.items():
         setattr(db_article, key, value)
 
-    # 3) 커밋 & 리프레시
+    # 나라/도시가 바뀌었으면 집계도 옮겨줌
+    new_location = (db_article.travelCountry, db_article.travelCity)
+    if new_location != old_location:
+        await adjust_location_count(db, *old_location, -1)
+        await adjust_location_count(db, *new_location, 1)
+    await bump_content_version(db, ARTICLES_VERSION)
+
+    # 3) 커밋 & 리프레시 (+ 캐시 무효화)
     await db.commit()
+    invalidate_article_list()
+    invalidate_article(article_id)
     await db.refresh(db_article)
     return db_article
 
@@ -89,12 +153,291 @@ async def delete_article(db: AsyncSession, article_id: str):
 
     # 2) 삭제 & 커밋
     await db.delete(db_article)
+    await adjust_location_count(db, db_article.travelCountry, db_article.travelCity, -1)
+    await bump_content_version(db, ARTICLES_VERSION)
     await db.commit()
+    invalidate_article_list()
+    invalidate_article(article_id)
     return db_article
 
 
+############# keyset pagination 커서 #################
+
+def encode_cursor(created_at: datetime, key) -> str:
+    """(createdAt, id) 를 클라이언트에 넘길 불투명 커서 문자열로 인코딩"""
+    raw = json.dumps([created_at.isoformat(), key]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, key_type: type = str) -> tuple[datetime, object]:
+    """encode_cursor 의 역변환. 잘못된 커서거나 id 가 key_type 이 아니면 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, key = json.loads(base64.urlsafe_b64decode(padded))
+        # JSON 의 true/false 는 int 의 하위 타입인 bool 로 풀리므로 따로 거름
+        if not isinstance(key, key_type) or isinstance(key, bool):
+            raise TypeError(f"cursor key must be {key_type.__name__}")
+        return datetime.fromisoformat(created_at), key
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+############# 게시글 목록 #################
+
+# 목록 응답에 필요한 컬럼만 조회 (본문 content / 관계 로딩 / identity map 없이 Row 로 반환)
+ARTICLE_LIST_COLUMNS = (
+    Article.articleID,
+    Article.articleTitle,
+    Article.articleAuthor,
+    Article.imageURL,
+    Article.travelCountry,
+    Article.travelCity,
+    Article.shareLink,
+    Article.price,
+    Article.view_count,
+    Article.createdAt,
+    Article.modifiedAt,
+)
+
+def _article_list_query(cursor: str | None = None, limit: int | None = None):
+    stmt = select(*ARTICLE_LIST_COLUMNS).order_by(Article.createdAt.desc(), Article.articleID.desc())
+    if cursor:
+        created_at, article_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(Article.createdAt, Article.articleID) < tuple_(created_at, article_id))
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+async def get_article_list(db: AsyncSession):
+    """전체 게시글 목록 (최신순, 목록 컬럼만)"""
+    result = await db.execute(_article_list_query())
+    return result.all()
+
+async def get_articles_page(db: AsyncSession, limit: int, cursor: str | None = None):
+    """
+    최신순 게시글 한 페이지와 다음 페이지 커서를 반환합니다.
+    limit+1 개를 읽어 다음 페이지 존재 여부를 판단하므로 COUNT 쿼리가 필요 없습니다.
+    """
+    result = await db.execute(_article_list_query(cursor, limit + 1))
+    articles = result.all()
+
+    next_cursor = None
+    if len(articles) > limit:
+        articles = articles[:limit]
+        last = articles[-1]
+        next_cursor = encode_cursor(last.createdAt, last.articleID)
+    return articles, next_cursor
+
+async def stream_articles(db: AsyncSession, cursor: str | None = None, limit: int | None = None):
+    """DB 커서에서 읽히는 대로 게시글을 하나씩 yield (서버 사이드 커서 사용)"""
+    stmt = _article_list_query(cursor, limit).execution_options(yield_per=500)
+    result = await db.stream(stmt)
+    async for row in result:
+        yield row
+
+async def get_user_article_list(db: AsyncSession, user_id: str):
+    """마이페이지용: 특정 사용자가 쓴 글 목록 (최신순, 목록 컬럼만)"""
+    result = await db.execute(
+        select(*ARTICLE_LIST_COLUMNS)
+        .where(Article.articleAuthor == user_id)
+        .order_by(Article.createdAt.desc(), Article.articleID.desc())
+    )
+    return result.all()
+
+async def get_country_counts(db: AsyncSession):
+    """여행 국가(travelCountry)별 게시글 수 [(country, count), ...] (집계 테이블에서 조회)"""
+    total = func.sum(ArticleLocationCount.count)
+    result = await db.execute(
+        select(ArticleLocationCount.travelCountry, total.label("count"))
+        .group_by(ArticleLocationCount.travelCountry)
+        .having(total > 0)
+    )
+    return [(country, int(count)) for country, count in result.all()]
+
+async def get_city_counts(db: AsyncSession, country: str):
+    """특정 국가의 도시(travelCity)별 게시글 수 [(city, count), ...] (집계 테이블에서 조회)"""
+    result = await db.execute(
+        select(ArticleLocationCount.travelCity, ArticleLocationCount.count)
+        .where(ArticleLocationCount.travelCountry == country, ArticleLocationCount.count > 0)
+        .order_by(ArticleLocationCount.count.desc())
+    )
+    return result.all()
+
+
+############# 게시글 상세 #################
+
+COMMENT_PAGE_SIZE = 20
+
+# 상세 응답의 댓글 첫 페이지에 필요한 컬럼 (json_agg 로 전송)
+COMMENT_PAGE_COLUMNS = (
+    Comment.commentID,
+    Comment.articleID,
+    Comment.commentAuthor,
+    Comment.content,
+    Comment.createdAt,
+    Comment.modifiedAt,
+)
+
+async def get_article_detail(
+    db: AsyncSession,
+    article_id: str,
+    user_id: str | None = None,
+    comment_limit: int = COMMENT_PAGE_SIZE,
+):
+    """
+    게시글 + 첫 페이지 댓글(작성순) + 전체 댓글 수 + 로그인 유저의 좋아요 여부를 한 번의 쿼리로 로드합니다.
+    댓글은 comment_limit+1 개만 읽어 json_agg 로 한 컬럼에 모으므로 게시글 행(본문 포함)은 한 번만 전송됩니다.
+    Returns (article, user_liked, comments, comment_count, comments_next_cursor). 글이 없으면 None
+    """
+    if user_id:
+        user_liked = exists().where(Like.articleID == Article.articleID, Like.userID == user_id)
+    else:
+        user_liked = literal(False)
+
+    comment_count = (
+        select(func.count(Comment.commentID))
+        .where(Comment.articleID == Article.articleID)
+        .scalar_subquery()
+    )
+    comment_page = (
+        select(*COMMENT_PAGE_COLUMNS)
+        .where(Comment.articleID == Article.articleID)
+        .order_by(Comment.createdAt.asc(), Comment.commentID.asc())
+        .limit(comment_limit + 1)
+        .correlate(Article)
+        .subquery("comment_page")
+    )
+    comment_json = func.json_build_object(
+        *(part for column in COMMENT_PAGE_COLUMNS for part in (literal(column.key), comment_page.c[column.key]))
+    )
+    comment_list = (
+        select(func.json_agg(
+            aggregate_order_by(comment_json, comment_page.c.createdAt, comment_page.c.commentID), type_=JSON
+        ))
+        .select_from(comment_page)
+        .scalar_subquery()
+    )
+
+    result = await db.execute(
+        select(Article, user_liked.label("user_liked"), comment_count.label("comment_count"), comment_list)
+        .where(Article.articleID == article_id)
+    )
+    row = result.first()
+    if row is None:
+        return None
+
+    article, liked, count, comment_rows = row
+    comments = [_comment_from_json(data) for data in comment_rows or []]
+    comments, next_cursor = _comment_page(comments, comment_limit)
+    return article, bool(liked), comments, count, next_cursor
+
+def _comment_from_json(data: dict) -> Comment:
+    """json_agg 로 받은 댓글 하나를 (세션에 붙지 않은) Comment 로 변환"""
+    for key in ("createdAt", "modifiedAt"):
+        if data[key] is not None:
+            data[key] = datetime.fromisoformat(data[key])
+    return Comment(**data)
+
+def _comment_page(comments: list, limit: int):
+    next_cursor = None
+    if len(comments) > limit:
+        comments = comments[:limit]
+        last = comments[-1]
+        next_cursor = encode_cursor(last.createdAt, last.commentID)
+    return comments, next_cursor
+
+async def flush_view_counts(db: AsyncSession, deltas: dict[str, int]):
+    """
+    {articleID: 증가분} 을 한 트랜잭션에서 반영합니다.
+    글마다 view_count = view_count + delta 를 executemany 로 실행하므로 lost update 가 없습니다.
+    """
+    if not deltas:
+        return
+    table = Article.__table__
+    await db.execute(
+        update(table)
+        .where(table.c.articleID == bindparam("b_article_id"))
+        # 조회는 글 수정이 아니므로 modifiedAt(onupdate) 은 그대로 둠
+        .values(view_count=table.c.view_count + bindparam("b_delta"), modifiedAt=table.c.modifiedAt),
+        [{"b_article_id": article_id, "b_delta": delta} for article_id, delta in deltas.items()]
+    )
+    await bump_content_version(db, ARTICLE_VIEWS_VERSION, min_interval=ARTICLE_VIEWS_VERSION_INTERVAL)
+    await db.commit()
+    # 캐시된 상세 응답의 view_count 에 반영분을 더함 (항목은 유지해서 캐시 hit / 304 가 계속 되도록)
+    add_article_views(deltas)
+
+
+############# 조건부 GET (ETag) 용 버전 정보 #################
+# 응답 본문을 만들지 않고 ETag 를 계산할 수 있도록 집계값만 조회
+
+async def bump_content_version(db: AsyncSession, key: str, min_interval: float = 0):
+    """
+    content_version[key] 를 1 올림 (호출한 쪽 트랜잭션에 포함, 커밋은 호출한 쪽에서).
+    min_interval 을 주면 마지막 증가 후 그만큼 지났을 때만 올림
+    """
+    now = datetime.utcnow()
+    stmt = (
+        update(ContentVersion)
+        .where(ContentVersion.key == key)
+        .values(version=ContentVersion.version + 1, bumpedAt=now)
+        .execution_options(synchronize_session=False)
+    )
+    if min_interval:
+        stmt = stmt.where(ContentVersion.bumpedAt < now - timedelta(seconds=min_interval))
+    await db.execute(stmt)
+
+async def get_article_list_version(db: AsyncSession):
+    """(글 버전, 조회수 버전). 전체 글을 집계하지 않고 content_version 의 두 행만 읽음"""
+    result = await db.execute(
+        select(ContentVersion.key, ContentVersion.version)
+        .where(ContentVersion.key.in_([ARTICLES_VERSION, ARTICLE_VIEWS_VERSION]))
+    )
+    versions = dict(result.all())
+    return versions.get(ARTICLES_VERSION, 0), versions.get(ARTICLE_VIEWS_VERSION, 0)
+
+async def get_article_detail_version(db: AsyncSession, article_id: str):
+    """(modifiedAt, likes, 댓글 수, 최근 댓글 수정 시각). 글이 없으면 None (조회수는 포함하지 않음)"""
+    comment_count = (
+        select(func.count(Comment.commentID))
+        .where(Comment.articleID == Article.articleID)
+        .scalar_subquery()
+    )
+    last_comment_at = (
+        select(func.max(Comment.modifiedAt))
+        .where(Comment.articleID == Article.articleID)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(Article.modifiedAt, Article.likes, comment_count, last_comment_at)
+        .where(Article.articleID == article_id)
+    )
+    row = result.first()
+    return tuple(row) if row else None
+
+async def get_user_articles_version(db: AsyncSession, user_id: str):
+    """(작성한 글 수, 최근 수정 시각, 조회수 합계)"""
+    result = await db.execute(
+        select(func.count(Article.articleID), func.max(Article.modifiedAt), func.sum(Article.view_count))
+        .where(Article.articleAuthor == user_id)
+    )
+    return tuple(result.one())
+
+
 ############# 댓글 #################
 
+# 댓글 목록 (keyset pagination, 작성순)
+async def get_comments_page(db: AsyncSession, article_id: str, limit: int = COMMENT_PAGE_SIZE, cursor: str | None = None):
+    stmt = (
+        select(Comment)
+        .where(Comment.articleID == article_id)
+        .order_by(Comment.createdAt.asc(), Comment.commentID.asc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        created_at, comment_id = decode_cursor(cursor, int)
+        stmt = stmt.where(tuple_(Comment.createdAt, Comment.commentID) > tuple_(created_at, comment_id))
+    result = await db.execute(stmt)
+    return _comment_page(result.scalars().all(), limit)
+
 # 댓글 생성
 async def create_comment(db: AsyncSession, comment_in: CommentCreate) -> Comment:
     db_comment = Comment(
@@ -104,6 +447,7 @@ async def create_comment(db: AsyncSession, comment_in: CommentCreate) -> Comment
     )
     db.add(db_comment)
     await db.commit()
+    invalidate_article(comment_in.articleID)
     await db.refresh(db_comment)
     return db_comment
 
@@ -115,6 +459,7 @@ async def update_comment(db: AsyncSession, comment_id: int, comment_in: CommentU
         return None
     db_comment.content = comment_in.content
     await db.commit()
+    invalidate_article(db_comment.articleID)
     await db.refresh(db_comment)
     return db_comment
 
@@ -126,53 +471,63 @@ async def delete_comment(db: AsyncSession, comment_id: int) -> bool:
         return False
     await db.delete(db_comment)
     await db.commit()
+    invalidate_article(db_comment.articleID)
     return True
 
 
 
 # Add new functions for like operations
 async def toggle_like(db: AsyncSession, article_id: str, user_id: str) -> dict:
-    """Toggle like status for an article. Returns dict with success and liked status."""
-    # Check if the user has already liked the article
-    result = await db.execute(
-        select(Like).where(Like.articleID == article_id, Like.userID == user_id)
-    )
-    existing_like = result.scalars().first()
-    
-    # Get article to update likes count
-    article_result = await db.execute(select(Article).where(Article.articleID == article_id))
-    article = article_result.scalars().first()
-    if not article:
-        return {"success": False, "liked": False, "likes_count": 0, "message": "Article not found"}
-    
-    if existing_like:
-        # User already liked the article, so unlike it
-        await db.delete(existing_like)
-        article.likes = max(0, article.likes - 1)  # Prevent negative count
-        liked = False
-    else:
-        # User hasn't liked the article yet, so like it
-        new_like = Like(articleID=article_id, userID=user_id)
-        db.add(new_like)
-        article.likes += 1
-        liked = True
-    
+    """
+    Toggle like status for an article. Returns dict with success and liked status.
+
+    Runs as atomic SQL in one transaction: DELETE ... RETURNING removes an existing like,
+    otherwise INSERT ... ON CONFLICT DO NOTHING RETURNING adds one, and the article counter
+    is adjusted in the database (likes = likes +/- 1), so concurrent toggles never lose updates.
+    """
     try:
+        # Unlike if the user already liked the article
+        deleted = await db.execute(
+            delete(Like)
+            .where(Like.articleID == article_id, Like.userID == user_id)
+            .returning(Like.likeID)
+        )
+        if deleted.first() is not None:
+            liked, delta = False, -1
+        else:
+            # Like it; a concurrent toggle by the same user may have inserted first
+            inserted = await db.execute(
+                pg_insert(Like)
+                .values(articleID=article_id, userID=user_id, createdAt=datetime.utcnow())
+                .on_conflict_do_nothing(constraint="unique_user_article_like")
+                .returning(Like.likeID)
+            )
+            liked, delta = True, (1 if inserted.first() is not None else 0)
+
+        counted = await db.execute(
+            update(Article)
+            .where(Article.articleID == article_id)
+            .values(likes=func.greatest(func.coalesce(Article.likes, 0) + delta, 0))
+            .returning(Article.likes)
+            .execution_options(synchronize_session=False)
+        )
+        likes_count = counted.scalar_one_or_none()
+        if likes_count is None:
+            await db.rollback()
+            return {"success": False, "liked": False, "likes_count": 0, "message": "Article not found"}
+
         await db.commit()
+        invalidate_article(article_id)
         return {
-            "success": True, 
-            "liked": liked, 
-            "likes_count": article.likes,
+            "success": True,
+            "liked": liked,
+            "likes_count": likes_count,
             "message": "Like toggled successfully"
         }
     except IntegrityError:
+        # e.g. the article was deleted concurrently (like.articleID FK violation)
         await db.rollback()
-        return {
-            "success": False, 
-            "liked": not liked, 
-            "likes_count": article.likes - (1 if liked else 0),
-            "message": "Error processing like"
-        }
+        return {"success": False, "liked": False, "likes_count": 0, "message": "Article not found"}
 
 # async def toggle_like(db: AsyncSession, article_id: str, user_id: str) -> dict:
 #     """Toggle like status for an article. Returns dict with success and liked status."""
@@ -267,3 +622,108 @@ async def get_dailies_for_user(db: AsyncSession, user_id: str):
         select(Daily).where(Daily.userID == user_id).order_by(Daily.date.asc())
     )
     return result.scalars().all()
+
+
+############# 잡지 자산 manifest #################
+
+async def allocate_asset_sequence(db: AsyncSession, user_id: str, magazine_id: str, category: str, count: int = 1) -> int:
+    """
+    잡지/카테고리별 일련번호 count 개를 원자적으로 할당하고 첫 번호를 반환합니다.
+    (동시 업로드끼리 같은 번호를 받지 않음)
+    """
+    stmt = pg_insert(MagazineSequence).values(
+        userID=user_id, magazineID=magazine_id, category=category, lastValue=count
+    )
+    result = await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[MagazineSequence.userID, MagazineSequence.magazineID, MagazineSequence.category],
+            set_={"lastValue": MagazineSequence.lastValue + count}
+        ).returning(MagazineSequence.lastValue)
+    )
+    last_value = result.scalar_one()
+    await db.commit()
+    return last_value - count + 1
+
+async def release_asset_sequence(db: AsyncSession, user_id: str, magazine_id: str, category: str, last_value: int, count: int):
+    """
+    allocate_asset_sequence 로 받은 블록 (마지막 번호 last_value) 의 끝 count 개를 되돌림.
+    그 사이 다른 할당이 있었으면 (lastValue 가 바뀌었으면) 아무것도 하지 않음
+    """
+    await db.execute(
+        update(MagazineSequence)
+        .where(
+            MagazineSequence.userID == user_id,
+            MagazineSequence.magazineID == magazine_id,
+            MagazineSequence.category == category,
+            MagazineSequence.lastValue == last_value,
+        )
+        .values(lastValue=last_value - count)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+async def raise_asset_sequence(db: AsyncSession, user_id: str, magazine_id: str, category: str, value: int):
+    """일련번호가 최소 value 이상이 되도록 (기존 자산 backfill 용)"""
+    stmt = pg_insert(MagazineSequence).values(
+        userID=user_id, magazineID=magazine_id, category=category, lastValue=value
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[MagazineSequence.userID, MagazineSequence.magazineID, MagazineSequence.category],
+            set_={"lastValue": func.greatest(MagazineSequence.lastValue, value)}
+        )
+    )
+    await db.commit()
+
+async def register_asset(db: AsyncSession, user_id: str, magazine_id: str, category: str, name: str,
+                         size: int | None = None, sha256: str | None = None, overwrite: bool = True):
+    """자산을 manifest 에 기록 (같은 이름이면 overwrite 일 때만 덮어쓰기)"""
+    stmt = pg_insert(MagazineAsset).values(
+        userID=user_id, magazineID=magazine_id, category=category, name=name,
+        size=size, sha256=sha256, createdAt=datetime.utcnow()
+    )
+    if overwrite:
+        stmt = stmt.on_conflict_do_update(
+            constraint="unique_magazine_asset",
+            set_={"size": stmt.excluded.size, "sha256": stmt.excluded.sha256, "createdAt": stmt.excluded.createdAt}
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(constraint="unique_magazine_asset")
+    await db.execute(stmt)
+    await db.commit()
+
+async def remove_asset(db: AsyncSession, user_id: str, magazine_id: str, category: str, name: str) -> bool:
+    result = await db.execute(
+        delete(MagazineAsset)
+        .where(
+            MagazineAsset.userID == user_id,
+            MagazineAsset.magazineID == magazine_id,
+            MagazineAsset.category == category,
+            MagazineAsset.name == name,
+        )
+        .returning(MagazineAsset.id)
+    )
+    removed = result.first() is not None
+    await db.commit()
+    return removed
+
+async def list_asset_names(db: AsyncSession, user_id: str, magazine_id: str, category: str) -> list[str]:
+    result = await db.execute(
+        select(MagazineAsset.name)
+        .where(
+            MagazineAsset.userID == user_id,
+            MagazineAsset.magazineID == magazine_id,
+            MagazineAsset.category == category,
+        )
+        .order_by(MagazineAsset.createdAt.asc(), MagazineAsset.id.asc())
+    )
+    return list(result.scalars().all())
+
+async def list_all_asset_names(db: AsyncSession, category: str) -> list[tuple[str, str, str]]:
+    """(userID, magazineID, name) of every asset in a category (backfill 용)"""
+    result = await db.execute(
+        select(MagazineAsset.userID, MagazineAsset.magazineID, MagazineAsset.name)
+        .where(MagazineAsset.category == category)
+        .order_by(MagazineAsset.id.asc())
+    )
+    return [tuple(row) for row in result.all()]
@@ -1,28 +1,103 @@
 import os
+import time
+from fastapi import Request
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from app.models import Base  # Base를 반드시 import해야 합니다!
 from dotenv import load_dotenv
 
+from app.db_metrics import InstrumentedQueuePool, PoolMetrics, instrument_engine
+
 # .env 파일에서 환경 변수 로드
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# 읽기 전용 복제본 DSN (없으면 primary 사용)
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+# 사용자가 쓰기 요청을 한 뒤 이 시간(초) 동안은 읽기도 primary 로 보냄 (read-your-writes)
+DB_READ_AFTER_WRITE_SECONDS = float(os.getenv("DB_READ_AFTER_WRITE_SECONDS", "5"))
+
+# 엔진 프로필 (DB_PROFILE=dev|prod|bench). 개별 값은 DB_POOL_* / DB_ECHO 환경변수로 덮어쓸 수 있음
+ENGINE_PROFILES = {
+    "dev": {"pool_size": 5, "max_overflow": 5, "pool_timeout": 30, "pool_recycle": 1800, "pool_pre_ping": True, "echo": False},
+    "prod": {"pool_size": 20, "max_overflow": 10, "pool_timeout": 10, "pool_recycle": 1800, "pool_pre_ping": True, "echo": False},
+    "bench": {"pool_size": 50, "max_overflow": 0, "pool_timeout": 30, "pool_recycle": -1, "pool_pre_ping": False, "echo": False},
+}
+DB_PROFILE = os.getenv("DB_PROFILE", "dev")
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    return default if value is None else value.lower() in ("1", "true", "yes")
+
+
+def engine_options(profile: str = DB_PROFILE) -> dict:
+    options = dict(ENGINE_PROFILES[profile])
+    options["pool_size"] = int(os.getenv("DB_POOL_SIZE", options["pool_size"]))
+    options["max_overflow"] = int(os.getenv("DB_MAX_OVERFLOW", options["max_overflow"]))
+    options["pool_timeout"] = float(os.getenv("DB_POOL_TIMEOUT", options["pool_timeout"]))
+    options["pool_recycle"] = int(os.getenv("DB_POOL_RECYCLE", options["pool_recycle"]))
+    options["pool_pre_ping"] = _env_bool("DB_POOL_PRE_PING", options["pool_pre_ping"])
+    # SQL 전체 로깅은 개발 시에만. 평소에는 db_metrics 의 slow query 로그 사용
+    options["echo"] = _env_bool("DB_ECHO", options["echo"])
+    return options
+
+
+def build_engine(url: str, metrics: PoolMetrics):
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        **engine_options(),
+    )
+    instrument_engine(engine.sync_engine, metrics)
+    return engine
+
 
 # 비동기 엔진 생성
-engine = create_async_engine(DATABASE_URL, echo=True)
+pool_metrics = PoolMetrics()
+engine = build_engine(DATABASE_URL, pool_metrics)
+
+# 읽기 전용 엔진 (복제본이 없으면 primary 엔진 공유)
+if DATABASE_READ_URL:
+    read_pool_metrics = PoolMetrics()
+    read_engine = build_engine(DATABASE_READ_URL, read_pool_metrics)
+else:
+    read_pool_metrics = None
+    read_engine = engine
 
 # 비동기 세션 설정
 AsyncSessionLocal = sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
+AsyncReadSessionLocal = sessionmaker(
+    bind=read_engine, class_=AsyncSession, expire_on_commit=False
+)
+
+WRITE_MARK_KEY = "db_write_at"
+
 
-# Dependency로 사용할 세션 생성
-async def get_db():
+def reads_primary(request: Request) -> bool:
+    """복제본이 설정되어 있고, 이 사용자가 최근에 쓰기를 해서 primary 에서 읽어야 하는지"""
+    if not DATABASE_READ_URL:
+        return False
+    last_write = request.session.get(WRITE_MARK_KEY)
+    return bool(last_write) and time.time() - last_write < DB_READ_AFTER_WRITE_SECONDS
+
+
+def read_session_factory(request: Request):
+    """최근에 쓰기를 한 사용자는 복제 지연을 피하기 위해 primary 에서 읽음"""
+    if reads_primary(request):
+        return AsyncSessionLocal
+    return AsyncReadSessionLocal
+
+# Dependency로 사용할 세션 생성 (쓰기용, primary)
+async def get_db(request: Request):
+    # 로그인 사용자의 변경 요청이면 read-your-writes 용으로 시각 기록
+    if request.method not in ("GET", "HEAD") and request.session.get("user"):
+        request.session[WRITE_MARK_KEY] = time.time()
     async with AsyncSessionLocal() as session:
         yield session
 
-# 테이블 생성 함수
-async def create_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+# Dependency로 사용할 읽기 전용 세션 생성 (복제본)
+async def get_read_db(request: Request):
+    async with read_session_factory(request)() as session:
+        yield session
@@ -0,0 +1,120 @@
+import bisect
+import logging
+import os
+import random
+import time
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+logger = logging.getLogger("app.sql")
+
+# 이 시간(ms)보다 오래 걸린 SQL 만 로그 (샘플링 비율 0~1)
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+DB_SLOW_QUERY_SAMPLE_RATE = float(os.getenv("DB_SLOW_QUERY_SAMPLE_RATE", "1.0"))
+
+# 히스토그램 버킷 상한 (ms)
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """누적 버킷 없이 구간별 카운트만 세는 간단한 지연시간 히스토그램 (ms)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def snapshot(self) -> dict:
+        labels = [f"<={b}ms" for b in self.buckets] + [f">{self.buckets[-1]}ms"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.checked_out = 0
+        self.checkouts = 0
+        self.connection_wait = LatencyHistogram()
+        self.statement_latency = LatencyHistogram()
+        self.slow_queries = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "checked_out": self.checked_out,
+            "checkouts": self.checkouts,
+            "connection_wait": self.connection_wait.snapshot(),
+            "statement_latency": self.statement_latency.snapshot(),
+            "slow_queries": self.slow_queries,
+            "slow_query_threshold_ms": DB_SLOW_QUERY_MS,
+        }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """커넥션을 얻기까지 기다린 시간을 기록하는 풀 (metrics 는 instrument_engine 에서 연결)"""
+
+    metrics: PoolMetrics | None = None
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.metrics is not None:
+                self.metrics.connection_wait.observe((time.perf_counter() - start) * 1000)
+
+
+def instrument_engine(sync_engine, metrics: PoolMetrics):
+    """커넥션 대기시간 / 체크아웃 수 / SQL 지연시간 수집과 샘플링된 slow query 로그를 엔진에 연결"""
+    if isinstance(sync_engine.pool, InstrumentedQueuePool):
+        sync_engine.pool.metrics = metrics
+
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(dbapi_conn, conn_record, conn_proxy):
+        metrics.checked_out += 1
+        metrics.checkouts += 1
+
+    @event.listens_for(sync_engine, "checkin")
+    def on_checkin(dbapi_conn, conn_record):
+        metrics.checked_out -= 1
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+        metrics.statement_latency.observe(elapsed_ms)
+        if elapsed_ms >= DB_SLOW_QUERY_MS:
+            metrics.slow_queries += 1
+            if random.random() < DB_SLOW_QUERY_SAMPLE_RATE:
+                logger.warning(f"Slow query ({elapsed_ms:.1f} ms): {statement[:1000]}")
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        # 실패한 문장은 after_cursor_execute 가 호출되지 않으므로 여기서 시작 시각을 꺼냄
+        # (ExceptionContext.cursor 는 SQLAlchemy 가 채우지 않으므로 statement 로 판단)
+        conn = exception_context.connection
+        if conn is None or exception_context.statement is None:
+            return
+        started = conn.info.get("query_start_time")
+        if started:
+            started.pop()
@@ -0,0 +1,159 @@
+import asyncio
+import io
+import math
+import multiprocessing
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image, ImageOps
+
+# 이미지 변환 전용 프로세스 수 (= 동시에 실행되는 변환 수)
+IMAGE_PROCESS_WORKERS = int(os.getenv("IMAGE_PROCESS_WORKERS", str(os.cpu_count() or 1)))
+# 헤더상 픽셀 수가 이보다 크면 decompression bomb 으로 보고 거부
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(100_000_000)))
+# 디코딩된 비트맵 한 장이 차지할 수 있는 최대 메모리 (MB)
+IMAGE_MAX_DECODED_MB = int(os.getenv("IMAGE_MAX_DECODED_MB", "128"))
+# 긴 변이 이보다 큰 이미지는 줄여서 디코딩/저장 (JPEG 는 draft 로 1/2, 1/4, 1/8 축소 디코딩)
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "6000"))
+# 업로드 시 함께 만드는 축소본 (긴 변 px) 과 포맷 (확장자)
+IMAGE_VARIANT_SIZES = tuple(int(v) for v in os.getenv("IMAGE_VARIANT_SIZES", "256,768,1600").split(","))
+IMAGE_VARIANT_FORMATS = ("jpg", "webp")
+
+_executor: ProcessPoolExecutor | None = None
+_semaphore: asyncio.Semaphore | None = None
+
+
+def _init_worker():
+    Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+    # Pillow 는 MAX_IMAGE_PIXELS 초과 시 경고만 하고 2배부터 예외를 던지므로 경고도 예외로 처리
+    warnings.simplefilter("error", Image.DecompressionBombWarning)
+
+
+def _bytes_per_pixel(mode: str) -> int:
+    return {"1": 1, "L": 1, "P": 1, "LA": 2, "RGB": 3, "YCbCr": 3, "I;16": 2}.get(mode, 4)
+
+
+def _open_bounded(image_bytes: bytes) -> Image.Image:
+    """헤더만 읽어 크기를 확인하고, 큰 JPEG 은 축소 디코딩을 걸어 둔 채로 반환"""
+    try:
+        img = Image.open(io.BytesIO(image_bytes))
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning) as e:
+        raise ValueError(f"Image too large: {e}")
+
+    width, height = img.size
+    if max(width, height) > IMAGE_MAX_DIMENSION:
+        # draft 는 결과가 요청 크기 이상으로 남는 가장 큰 1/2^n 축소를 고르므로, 요청을
+        # IMAGE_MAX_DIMENSION 의 절반 남짓으로 해야 긴 변이 (IMAGE_MAX_DIMENSION/2, IMAGE_MAX_DIMENSION] 로 줄어듦
+        # (나머지는 _normalize 의 thumbnail 이 처리). JPEG 이외의 포맷은 draft 가 아무것도 하지 않음
+        scale = (IMAGE_MAX_DIMENSION // 2 + 1) / max(width, height)
+        img.draft(img.mode, (math.ceil(width * scale), math.ceil(height * scale)))
+
+    width, height = img.size
+    decoded_bytes = width * height * _bytes_per_pixel(img.mode)
+    if decoded_bytes > IMAGE_MAX_DECODED_MB * 1024 * 1024:
+        raise ValueError(f"Image too large to process: {width}x{height}")
+    return img
+
+
+def _normalize(image_bytes: bytes) -> Image.Image:
+    img = _open_bounded(image_bytes)
+    if max(img.size) > IMAGE_MAX_DIMENSION:
+        img.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION), Image.LANCZOS)
+
+    # Apply EXIF rotation
+    img = ImageOps.exif_transpose(img)
+
+    # Convert to RGB (JPEG doesn't support RGBA)
+    if img.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+        img = background
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+    return img
+
+
+def _encode_jpeg(img: Image.Image, quality: int) -> bytes:
+    output_buffer = io.BytesIO()
+    img.save(output_buffer, format='JPEG', quality=quality, optimize=True)
+    return output_buffer.getvalue()
+
+
+def _render_variants(img: Image.Image) -> dict[tuple[int, str], bytes]:
+    """(긴 변 px, 확장자) -> 인코딩된 축소본. 큰 것부터 줄여 나가며 직전 결과를 재사용"""
+    variants = {}
+    current = img
+    for size in sorted(IMAGE_VARIANT_SIZES, reverse=True):
+        current = current.copy()
+        # thumbnail 은 확대하지 않으므로 원본보다 큰 size 는 원본 크기로 저장됨
+        current.thumbnail((size, size), Image.LANCZOS)
+        variants[(size, "jpg")] = _encode_jpeg(current, quality=85)
+        webp_buffer = io.BytesIO()
+        current.save(webp_buffer, format='WEBP', quality=80, method=4)
+        variants[(size, "webp")] = webp_buffer.getvalue()
+    return variants
+
+
+def process_image_bytes(image_bytes: bytes) -> bytes:
+    """
+    Process image bytes: apply EXIF rotation and convert to RGB
+    Returns processed image as JPEG bytes
+    """
+    return _encode_jpeg(_normalize(image_bytes), quality=95)
+
+
+def process_image_with_variants(image_bytes: bytes) -> tuple[bytes, dict[tuple[int, str], bytes]]:
+    """process_image_bytes + 같은 디코딩 결과로 만든 축소본들"""
+    img = _normalize(image_bytes)
+    return _encode_jpeg(img, quality=95), _render_variants(img)
+
+
+def image_variants_from_bytes(image_bytes: bytes) -> dict[tuple[int, str], bytes]:
+    """이미 처리된 원본(JPEG)에서 축소본만 생성 (backfill 용)"""
+    return _render_variants(_normalize(image_bytes))
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: 이벤트 루프/DB 풀 스레드가 떠 있는 프로세스를 fork 하지 않음
+        _executor = ProcessPoolExecutor(
+            max_workers=IMAGE_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+    return _executor
+
+
+async def _run(func, *args):
+    global _semaphore, _executor
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(IMAGE_PROCESS_WORKERS)
+    async with _semaphore:
+        executor = _get_executor()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # 워커가 죽으면 (OOM 등) 풀 전체가 못 쓰게 되므로 버리고 다음 호출에서 새로 만듦.
+            # 같은 풀에서 실패한 다른 호출이 이미 새 풀을 만들었으면 그대로 둠
+            if _executor is executor:
+                _executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise ValueError("Image processing failed (worker crashed)")
+
+
+async def process_image_and_variants(image_bytes: bytes) -> tuple[bytes, dict[tuple[int, str], bytes]]:
+    return await _run(process_image_with_variants, image_bytes)
+
+
+async def make_image_variants(image_bytes: bytes) -> dict[tuple[int, str], bytes]:
+    return await _run(image_variants_from_bytes, image_bytes)
+
+
+def shutdown():
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
@@ -1,9 +1,13 @@
 import os
+import json
+import hashlib
 import logging
+import mimetypes
 import tempfile
+import time
 import uuid
 
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, Response
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 
@@ -15,6 +19,7 @@ from fastapi import (
     Depends,
     UploadFile,
     File,
+    Query,
     status
 )
 from fastapi.responses import JSONResponse
@@ -23,16 +28,19 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import delete, func, update
+from sqlalchemy import delete, update
 from starlette.middleware.sessions import SessionMiddleware
 from dotenv import load_dotenv
 from zoneinfo import ZoneInfo
 from pydantic import EmailStr
 from typing import List
+import aiofiles
 
-from passlib.context import CryptContext
+from app import passwords, image_processing
+from app.image_processing import IMAGE_VARIANT_SIZES
 
-from app.database import get_db, create_tables
+from app.database import get_db, get_read_db, read_session_factory, reads_primary, engine, read_engine, pool_metrics, read_pool_metrics
+from app.migrations import check_schema_version
 from app.models import User, Article, Comment, Like
 from app.schemas import (
     UserCreate,
@@ -51,11 +59,28 @@ from app.crud import (
     update_comment,
     delete_comment,
     toggle_like,
-    check_user_liked
+    check_user_liked,
+    get_article_detail,
+    get_article_list,
+    get_articles_page,
+    stream_articles,
+    get_user_article_list,
+    get_country_counts,
+    get_city_counts,
+    get_article_list_version,
+    get_article_detail_version,
+    get_user_articles_version,
+    remove_author_location_counts,
+    bump_content_version,
+    ARTICLES_VERSION,
+    decode_cursor,
+    get_comments_page
 )
 
 from app.models import Daily
 from app.schemas import DailyCreate, DailyRead
+from app.view_counter import view_counter
+from app.cache import response_cache, article_list_key, article_detail_key, get_versioned, set_versioned
 from sqlalchemy.future import select
 from dotenv import load_dotenv
 load_dotenv()
@@ -65,17 +90,27 @@ import os
 from app.stt import transcribe_audio
 from app.tts import lan_det, request_tts
 from app.azure_utils import (
-    upload_image_if_not_exists,
+    upload_images,
+    image_variant_urls,
     delete_image,
     list_images,
     generate_blob_sas_url,
+    generate_blob_sas_urls,
     list_output_files,
     upload_output_file,
     is_image_safe_for_upload,
     upload_profile_image,
-    delete_interview_result
+    delete_interview_result,
+    upload_interview_result,
+    list_text_files,
+    create_upload_session,
+    complete_upload_session,
+    UPLOAD_SESSION_MAX_BYTES,
+    storage,
+    safety_checker,
+    folder_cache
 )
-from azure.core.exceptions import ResourceNotFoundError
+from app.storage import BlobNotFoundError, LocalStorage, StorageError
 
 # ---------------------------------------------------
 # 환경 변수 로드 및 기본 설정
@@ -88,8 +123,6 @@ SESSION_SECRET_KEY = os.getenv("SESSION_SECRET_KEY")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 app = FastAPI(title="CRUD & STT Web App (JSON API)")
 templates = Jinja2Templates(directory=os.path.join(os.path.dirname(__file__), "templates"))
 
@@ -113,11 +146,48 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
 # ---------------------------------------------------
-# 앱 시작 시 DB 테이블 생성
+# 앱 시작 시 DB 스키마 버전 확인 (마이그레이션: python -m app.manage migrate)
 # ---------------------------------------------------
 @app.on_event("startup")
 async def on_startup():
-    await create_tables()
+    await check_schema_version()
+    await storage.open()
+    view_counter.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # 버퍼에 남은 조회수 반영
+    await view_counter.stop()
+    await storage.close()
+    await safety_checker.close()
+    passwords.shutdown()
+    image_processing.shutdown()
+
+
+# ---------------------------------------------------
+# 운영 지표
+# ---------------------------------------------------
+@app.get("/metrics/", include_in_schema=False)
+async def metrics():
+    return JSONResponse(
+        status_code=200,
+        content={
+            "database": {
+                **pool_metrics.snapshot(),
+                "pool": engine.pool.status()
+            },
+            "database_replica": {
+                **read_pool_metrics.snapshot(),
+                "pool": read_engine.pool.status()
+            } if read_pool_metrics else None,
+            "storage": storage.stats(),
+            "view_counter": view_counter.stats(),
+            "response_cache": response_cache.stats(),
+            "content_safety": safety_checker.stats(),
+            "folder_cache": folder_cache.stats()
+        }
+    )
 
 
 # ---------------------------------------------------
@@ -127,13 +197,53 @@ async def get_current_user(request: Request) -> str | None:
     return request.session.get("user")
 
 
+# ---------------------------------------------------
+# 유틸: 업로드 파일을 청크 단위로 읽기 (전체를 메모리에 올리지 않음)
+# ---------------------------------------------------
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+OUTPUT_UPLOAD_MAX_BYTES = int(os.getenv("OUTPUT_UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+TRANSCRIBE_MAX_BYTES = 100 * 1024 * 1024
+
+
+async def iter_upload_chunks(file: UploadFile, max_bytes: int):
+    total = 0
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        total += len(chunk)
+        if total > max_bytes:
+            raise HTTPException(status_code=413, detail=f"File too large (max {max_bytes // (1024 * 1024)}MB)")
+        yield chunk
+
+
+# ---------------------------------------------------
+# 유틸: 조건부 GET (weak ETag / If-None-Match)
+# ---------------------------------------------------
+def weak_etag(*parts) -> str:
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # weak 비교: W/ 접두어는 무시
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
 # ---------------------------------------------------
 # 인증: 회원가입 / 로그인 / 로그아웃
 # ---------------------------------------------------
 
 
 @app.get("/check_userid/", summary="userID 중복 확인")
-async def check_userid(userID: str, db: AsyncSession = Depends(get_db)):
+async def check_userid(userID: str, db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(select(User).where(User.userID == userID))
     exists = result.scalar_one_or_none() is not None
     return JSONResponse(status_code=200, content={"available": not exists})
@@ -157,8 +267,8 @@ async def signup(
             content={"success": False, "error": "이미 존재하는 이메일입니다."}
         )
 
-    # 비밀번호 해싱
-    hashed_pw = pwd_context.hash(password)
+    # 비밀번호 해싱 (이벤트 루프 밖 전용 스레드에서)
+    hashed_pw = await passwords.hash_password(password)
     user_in = UserCreate(
         userID=userID,
         userName=userName,
@@ -191,12 +301,18 @@ async def login(
 ):
     result = await db.execute(select(User).where(User.userID == userID))
     user = result.scalars().first()
-    if not user or not pwd_context.verify(password, user.userPasswordHash):
+    verified, new_hash = await passwords.verify_password(password, user.userPasswordHash) if user else (False, None)
+    if not verified:
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             content={"success": False, "error": "아이디 또는 비밀번호가 잘못되었습니다."}
         )
 
+    # bcrypt cost 가 바뀌었으면 새 cost 로 재해시해서 저장
+    if new_hash:
+        user.userPasswordHash = new_hash
+        await db.commit()
+
     request.session["user"] = user.userID
     return JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -217,94 +333,172 @@ async def logout(request: Request):
 # 게시판 CRUD (Articles / Comments / Likes)
 # ---------------------------------------------------
 
+def article_summary(art) -> dict:
+    """목록 응답용 게시글 dict (본문 content 제외)"""
+    return {
+        "articleID": art.articleID,
+        "articleTitle": art.articleTitle,
+        "articleAuthor": art.articleAuthor,
+        "imageURL": art.imageURL,
+        "travelCountry": art.travelCountry,
+        "travelCity": art.travelCity,
+        "shareLink": art.shareLink,
+        "price": art.price,
+        "view_count": art.view_count,
+        "createdAt": art.createdAt.isoformat(),
+        "updatedAt": art.modifiedAt.isoformat() if art.modifiedAt else None
+    }
+
+
+def comment_data(com) -> dict:
+    return {
+        "commentID": com.commentID,
+        "articleID": com.articleID,
+        "commentAuthor": com.commentAuthor,
+        "content": com.content,
+        "createdAt": com.createdAt.isoformat(),
+        "updatedAt": com.modifiedAt.isoformat() if com.modifiedAt else None
+    }
+
+
 @app.get("/articles/")
-async def list_articles(db: AsyncSession = Depends(get_db)):
+async def list_articles(
+    request: Request,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=100),
+    stream: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+):
     """
     모든 글 목록을 최신 순서로 반환
+    - limit / cursor 를 주면 (createdAt, articleID) 기준 keyset 페이지네이션으로 동작하고 next_cursor 를 함께 반환
+    - stream=true 이면 DB 커서에서 읽히는 대로 한 줄에 한 글씩 NDJSON 으로 스트리밍
+    - If-None-Match 가 현재 ETag 와 같으면 본문 없이 304 반환
     """
-    result = await db.execute(select(Article).order_by(Article.createdAt.desc()))
-    articles = result.scalars().all()
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={"success": False, "message": "잘못된 cursor 입니다."}
+            )
 
-    # JSON 직렬화용: Pydantic Schema를 따로 쓰지 않고, 간단히 dict 변환
-    article_list = []
-    for art in articles:
-        article_list.append({
-            "articleID": art.articleID,
-            "articleTitle": art.articleTitle,
-            "articleAuthor": art.articleAuthor,
-            "imageURL": art.imageURL,
-            "travelCountry": art.travelCountry,
-            "travelCity": art.travelCity,
-            "shareLink": art.shareLink,
-            "price": art.price,
-            "view_count": art.view_count,
-            "createdAt": art.createdAt.isoformat(),
-            "updatedAt": art.modifiedAt.isoformat() if art.modifiedAt else None
-        })
+    if stream:
+        session_factory = read_session_factory(request)
+
+        async def ndjson_rows():
+            # 응답이 끝날 때까지 세션을 유지해야 하므로 의존성 세션 대신 별도 세션 사용
+            async with session_factory() as stream_db:
+                async for art in stream_articles(stream_db, cursor, limit):
+                    yield json.dumps(article_summary(art), ensure_ascii=False) + "\n"
+
+        return StreamingResponse(ndjson_rows(), media_type="application/x-ndjson")
+
+    etag = weak_etag("articles", cursor, limit, *(await get_article_list_version(db)))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    # 캐시 항목은 만들 때의 ETag 와 함께 저장하고, 현재 ETag 와 다르면 miss 로 처리.
+    # 최근에 쓰기를 한 사용자(primary 에서 읽는 요청)는 캐시를 거치지 않음 (read-your-writes)
+    use_cache = not reads_primary(request)
+    cache_key = article_list_key(cursor, limit)
+    content = get_versioned(cache_key, etag) if use_cache else None
+    if content is None:
+        if limit is not None or cursor:
+            articles, next_cursor = await get_articles_page(db, limit or 20, cursor)
+            content = {
+                "success": True,
+                "articles": [article_summary(art) for art in articles],
+                "next_cursor": next_cursor
+            }
+        else:
+            articles = await get_article_list(db)
+
+            # JSON 직렬화용: Pydantic Schema를 따로 쓰지 않고, 간단히 dict 변환
+            article_list = [article_summary(art) for art in articles]
+            content = {"success": True, "articles": article_list}
+        if use_cache:
+            set_versioned(cache_key, etag, content)
 
-    return JSONResponse(status_code=200, content={"success": True, "articles": article_list})
+    return JSONResponse(status_code=200, content=content, headers={"ETag": etag})
 
 
 @app.get("/articles/{article_id}")
 async def article_detail(
     article_id: str,
     request: Request,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     특정 글의 상세 정보 + 댓글 목록 반환
+    (If-None-Match 가 현재 ETag 와 같으면 본문 없이 304 반환)
     """
-    result = await db.execute(select(Article).where(Article.articleID == article_id))
-    article = result.scalars().first()
-    if not article:
-        raise HTTPException(status_code=404, detail="Article not found")
-    
-    # 조회수 1 증가 (view_count를 1 올리고 DB에 반영)
-    article.view_count += 1
-    await db.commit()
-
-    # 댓글 로드
-    comments_result = await db.execute(
-        select(Comment).where(Comment.articleID == article_id).order_by(Comment.createdAt.asc())
-    )
-    comments = comments_result.scalars().all()
-
-    comment_list = []
-    for com in comments:
-        comment_list.append({
-            "commentID": com.commentID,
-            "articleID": com.articleID,
-            "commentAuthor": com.commentAuthor,
-            "content": com.content,
-            "createdAt": com.createdAt.isoformat(),
-            "updatedAt": com.modifiedAt.isoformat() if com.modifiedAt else None
-        })
-
-    # 로그인 유저가 좋아요를 눌렀는지 여부
     user_id = await get_current_user(request)
-    user_liked = False
-    if user_id:
-        user_liked = await check_user_liked(db, article_id, user_id)
-
-    article_data = {
-        "articleID": article.articleID,
-        "articleTitle": article.articleTitle,
-        "articleAuthor": article.articleAuthor,
-        "content": article.content,
-        "imageURL": article.imageURL,
-        "travelCountry": article.travelCountry,
-        "travelCity": article.travelCity,
-        "shareLink": article.shareLink,
-        "price": article.price,
-        "view_count": article.view_count,
-        "createdAt": article.createdAt.isoformat(),
-        "updatedAt": article.modifiedAt.isoformat() if article.modifiedAt else None,
-        "comments": comment_list,
-        "likes": article.likes,
-        "userLiked": user_liked
-    }
 
-    return JSONResponse(status_code=200, content={"success": True, "article": article_data})
+    # 본문을 만들기 전에 (수정 시각, 좋아요 수, 댓글 수/최근 시각) 만으로 ETag 비교
+    # (조회수는 포함하지 않음: flush 마다 태그가 바뀌면 많이 읽히는 글일수록 304 / 캐시 hit 가 사라짐)
+    version = await get_article_detail_version(db, article_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Article not found")
+    # 캐시 항목의 버전 (사용자 무관) / 응답 ETag (사용자별 userLiked 포함)
+    content_version = weak_etag("article", article_id, *version)
+    etag = weak_etag(content_version, user_id)
+    if etag_matches(request, etag):
+        view_counter.add(article_id)
+        return not_modified(etag)
+
+    # 최근에 쓰기를 한 사용자는 캐시를 거치지 않고 primary 에서 읽은 값으로 응답
+    use_cache = not reads_primary(request)
+    cache_key = article_detail_key(article_id)
+    article_data = get_versioned(cache_key, content_version) if use_cache else None
+    if article_data is None:
+        # 글 + 댓글 + 로그인 유저의 좋아요 여부를 한 번에 로드
+        detail = await get_article_detail(db, article_id, user_id)
+        if not detail:
+            raise HTTPException(status_code=404, detail="Article not found")
+        article, user_liked, comments, comment_count, comments_next_cursor = detail
+
+        # 댓글은 첫 페이지만 포함 (나머지는 GET /articles/{article_id}/comments/?cursor=)
+        comment_list = [comment_data(com) for com in comments]
+
+        # 캐시에는 사용자별 값(userLiked)을 빼고 저장
+        article_data = {
+            "articleID": article.articleID,
+            "articleTitle": article.articleTitle,
+            "articleAuthor": article.articleAuthor,
+            "content": article.content,
+            "imageURL": article.imageURL,
+            "travelCountry": article.travelCountry,
+            "travelCity": article.travelCity,
+            "shareLink": article.shareLink,
+            "price": article.price,
+            "view_count": article.view_count,
+            "createdAt": article.createdAt.isoformat(),
+            "updatedAt": article.modifiedAt.isoformat() if article.modifiedAt else None,
+            "comments": comment_list,
+            "commentCount": comment_count,
+            "commentsNextCursor": comments_next_cursor,
+            "likes": article.likes
+        }
+        if use_cache:
+            set_versioned(cache_key, content_version, article_data)
+    elif user_id:
+        user_liked = await check_user_liked(db, article_id, user_id)
+    else:
+        user_liked = False
+
+    # 조회수 1 증가는 버퍼에 모았다가 주기적으로 일괄 반영
+    view_counter.add(article_id)
+
+    return JSONResponse(status_code=200, content={
+        "success": True,
+        "article": {
+            **article_data,
+            "view_count": article_data["view_count"] + view_counter.pending(article_id),  # 아직 반영 안 된 조회 포함
+            "userLiked": user_liked
+        }
+    }, headers={"ETag": etag})
 
 
 @app.post("/articles/")
@@ -436,6 +630,39 @@ async def delete_article_endpoint(
     )
 
 
+@app.get("/articles/{article_id}/comments/")
+async def list_comments(
+    article_id: str,
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    댓글 목록을 작성순으로 (createdAt, commentID) keyset 페이지네이션하여 반환
+    """
+    try:
+        comments, next_cursor = await get_comments_page(db, article_id, limit, cursor)
+    except ValueError:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"success": False, "message": "잘못된 cursor 입니다."}
+        )
+
+    if not comments and not cursor:
+        result = await db.execute(select(Article.articleID).where(Article.articleID == article_id))
+        if result.first() is None:
+            raise HTTPException(status_code=404, detail="Article not found")
+
+    return JSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "comments": [comment_data(com) for com in comments],
+            "next_cursor": next_cursor
+        }
+    )
+
+
 @app.post("/articles/{article_id}/comments/")
 async def post_comment(
     request: Request,
@@ -576,7 +803,7 @@ async def like_article(
 # ---------------------------------------------------
 
 @app.get("/mypage/")
-async def mypage(request: Request, db: AsyncSession = Depends(get_db)):
+async def mypage(request: Request, db: AsyncSession = Depends(get_read_db)):
     """
     마이페이지: 현재 로그인된 사용자의 정보 + 작성한 게시글 목록 반환
     """
@@ -597,19 +824,22 @@ async def mypage(request: Request, db: AsyncSession = Depends(get_db)):
             content={"success": False, "message": "유효하지 않은 세션입니다. 다시 로그인해주세요."}
         )
 
-    # 본인이 쓴 글 로드
-    result_articles = await db.execute(
-        select(Article)
-        .where(Article.articleAuthor == user_id)
-        .order_by(Article.createdAt.desc())
+    etag = weak_etag(
+        "mypage", user.userID, user.userName, user.userEmail, user.userCountry,
+        user.userLanguage, user.profileImage, *(await get_user_articles_version(db, user_id))
     )
-    my_articles = result_articles.scalars().all()
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    # 본인이 쓴 글 로드 (목록 컬럼만)
+    my_articles = await get_user_article_list(db, user_id)
 
     article_list = []
     for art in my_articles:
         article_list.append({
             "articleID": art.articleID,
             "articleTitle": art.articleTitle,
+            "view_count": art.view_count,
             "createdAt": art.createdAt.isoformat(),
             "updatedAt": art.modifiedAt.isoformat() if art.modifiedAt else None
         })
@@ -620,15 +850,11 @@ async def mypage(request: Request, db: AsyncSession = Depends(get_db)):
         "userEmail": user.userEmail,
         "userCountry": user.userCountry,
         "userLanguage": user.userLanguage,
-        "content": art.content,  
         "profileImage": user.profileImage,
-        "view_count": art.view_count,
-        "createdAt": user.createdAt.isoformat(),
-        "updatedAt": user.modifiedAt.isoformat() if user.modifiedAt else None,
         "myArticles": article_list
     }
 
-    return JSONResponse(status_code=200, content={"success": True, "user": user_data})
+    return JSONResponse(status_code=200, content={"success": True, "user": user_data}, headers={"ETag": etag})
 
 
 @app.put("/profile/")
@@ -669,7 +895,7 @@ async def edit_profile(
         "userLanguage": userLanguage,
     }
     if password:
-        update_data["userPasswordHash"] = pwd_context.hash(password)
+        update_data["userPasswordHash"] = await passwords.hash_password(password)
 
     # 프로필 이미지가 업로드되었다면 저장하고 URL 업데이트
     if profile_image:
@@ -677,7 +903,7 @@ async def edit_profile(
         content = await profile_image.read()
 
         # Optional: Safety check
-        is_safe, analysis = is_image_safe_for_upload(content, profile_image.filename)
+        is_safe, analysis = await is_image_safe_for_upload(content, profile_image.filename)
         if not is_safe:
             return JSONResponse(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -685,7 +911,7 @@ async def edit_profile(
             )
         
         # Upload and get SAS-protected URL
-        image_url = upload_profile_image(user_id, content)
+        image_url = await upload_profile_image(user_id, content)
         update_data["profileImage"] = image_url
 
     await db.execute(
@@ -733,9 +959,13 @@ async def delete_account(request: Request, db: AsyncSession = Depends(get_db)):
     # 댓글, 좋아요, 게시글, 사용자 순서로 삭제
     await db.execute(delete(Comment).where(Comment.commentAuthor == user_id))
     await db.execute(delete(Like).where(Like.userID == user_id))
+    await remove_author_location_counts(db, user_id)
     await db.execute(delete(Article).where(Article.articleAuthor == user_id))
     await db.execute(delete(User).where(User.userID == user_id))
+    await bump_content_version(db, ARTICLES_VERSION)
     await db.commit()
+    # 여러 글의 목록/댓글/좋아요가 한꺼번에 바뀌므로 응답 캐시 전체 비움
+    response_cache.clear()
 
     request.session.clear()
     return JSONResponse(
@@ -786,22 +1016,21 @@ async def transcribe(
                 detail=f"Unsupported audio format: {file_ext}. Supported formats: {', '.join(allowed_formats)}"
             )
 
-        content = await audio_file.read()
-        file_size = len(content)
-        logger.info(f"Received audio file: {audio_file.filename} ({file_size} bytes)")
-
-        if file_size > 100 * 1024 * 1024:
-            raise HTTPException(status_code=413, detail="File too large (max 100MB)")
-        if file_size == 0:
-            raise HTTPException(status_code=400, detail="Empty file uploaded")
-
-        # 임시 파일로 저장
+        # 임시 파일로 저장 (청크 단위로 복사하며 크기 제한 확인)
         with tempfile.NamedTemporaryFile(suffix=file_ext, delete=False) as temp_file:
-            temp_file.write(content)
             temp_path = temp_file.name
-        logger.info(f"Saved temporary file: {temp_path}")
 
         try:
+            file_size = 0
+            async with aiofiles.open(temp_path, "wb") as f:
+                async for chunk in iter_upload_chunks(audio_file, TRANSCRIBE_MAX_BYTES):
+                    await f.write(chunk)
+                    file_size += len(chunk)
+            logger.info(f"Received audio file: {audio_file.filename} ({file_size} bytes) -> {temp_path}")
+
+            if file_size == 0:
+                raise HTTPException(status_code=400, detail="Empty file uploaded")
+
             # STT 수행
             logger.info("Starting STT processing...")
             result = transcribe_audio(
@@ -941,19 +1170,13 @@ async def tts_info():
 
 ######### 나라별 article 개수 ##########
 @app.get("/articles/country-counts/", summary="나라별 게시글 수 반환")
-async def country_counts(db: AsyncSession = Depends(get_db)):
+async def country_counts(db: AsyncSession = Depends(get_read_db)):
     """
     전체 게시글에서 여행 국가(travelCountry)별로
-    게시글 개수를 집계하여 반환합니다.
+    게시글 개수를 집계하여 반환합니다. (article_location_count 집계 테이블 사용)
     """
     # travelCountry별 count 집계
-    result = await db.execute(
-        select(
-            Article.travelCountry,
-            func.count(Article.articleID).label("count")
-        ).group_by(Article.travelCountry)
-    )
-    rows = result.all()
+    rows = await get_country_counts(db)
 
     # JSON 직렬화
     data = [
@@ -964,32 +1187,187 @@ async def country_counts(db: AsyncSession = Depends(get_db)):
     return JSONResponse(status_code=200, content={"success": True, "data": data})
 
 
+@app.get("/articles/country-counts/{country}/cities/", summary="도시별 게시글 수 반환")
+async def city_counts(country: str, db: AsyncSession = Depends(get_read_db)):
+    """
+    특정 여행 국가의 도시(travelCity)별 게시글 개수를 반환합니다.
+    (country 가 "Unknown" 이면 국가가 비어 있는 글)
+    """
+    rows = await get_city_counts(db, "" if country == "Unknown" else country)
+
+    data = [
+        {"city": city or "Unknown", "count": count}
+        for city, count in rows
+    ]
+
+    return JSONResponse(status_code=200, content={"success": True, "country": country, "data": data})
+
+
 # ---------------------------------------------------
 # 블롭 스토리지 업로드 조회 삭제 엔드포인트 (JSON)
 # ---------------------------------------------------
 
 
+@app.get("/storage/{blob_path:path}", include_in_schema=False)
+async def serve_local_blob(request: Request, blob_path: str, exp: int, sig: str):
+    """
+    STORAGE_BACKEND=local 일 때 storage.sign_url 로 발급한 서명 URL 을 서빙 (Range 요청 지원)
+    """
+    if not isinstance(storage, LocalStorage) or not storage.verify_signature(blob_path, exp, sig):
+        return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"success": False, "message": "Invalid or expired signature"})
+
+    try:
+        size = await storage.size(blob_path)
+    except StorageError:
+        # 없는 파일 / '..' 등이 들어간 잘못된 경로
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"success": False, "message": "File not found"})
+
+    media_type = mimetypes.guess_type(blob_path)[0] or "application/octet-stream"
+    # 서명 URL 은 만료 시각 단위로 고정되므로 만료 전까지 브라우저 캐시 허용
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": f"private, max-age={max(exp - int(time.time()), 0)}"}
+
+    # 단일 구간 Range (bytes=start-end / bytes=start- / bytes=-suffix) 만 지원
+    range_header = request.headers.get("range")
+    if range_header and range_header.startswith("bytes=") and "," not in range_header:
+        start_str, _, end_str = range_header[len("bytes="):].partition("-")
+        try:
+            if start_str:
+                start = int(start_str)
+                end = min(int(end_str), size - 1) if end_str else size - 1
+            else:
+                start = max(size - int(end_str), 0)
+                end = size - 1
+        except ValueError:
+            start, end = 0, -1
+        if start > end or start >= size:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        data = await storage.get(blob_path, offset=start, length=end - start + 1)
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return Response(content=data, status_code=206, media_type=media_type, headers=headers)
+
+    data = await storage.get(blob_path)
+    return Response(content=data, media_type=media_type, headers=headers)
+
+
+@app.put("/storage/{blob_path:path}", include_in_schema=False)
+async def receive_local_blob(request: Request, blob_path: str, exp: int, sig: str):
+    """
+    STORAGE_BACKEND=local 일 때 storage.sign_upload_url 로 발급한 업로드 URL 로 PUT 받은 본문을 저장
+    (Azure 에서는 클라이언트가 SAS URL 로 바로 업로드)
+    """
+    if not isinstance(storage, LocalStorage) or not storage.verify_signature(blob_path, exp, sig, write=True):
+        return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"success": False, "message": "Invalid or expired signature"})
+
+    max_bytes = max(UPLOAD_SESSION_MAX_BYTES.values())
+
+    async def body_chunks():
+        total = 0
+        async for chunk in request.stream():
+            total += len(chunk)
+            if total > max_bytes:
+                raise HTTPException(status_code=413, detail="File too large")
+            yield chunk
+
+    content_type = request.headers.get("content-type")
+    try:
+        await storage.put_stream(blob_path, body_chunks(), content_type=content_type, overwrite=True)
+    except StorageError:
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"success": False, "message": "Invalid blob path"})
+    return Response(status_code=201)
+
+
+# ---------------------------------------------------
+# 업로드 세션: 클라이언트가 스토리지에 직접 업로드 (앱 서버는 URL 발급 / 검증만)
+# ---------------------------------------------------
+@app.post("/uploads/sessions/")
+async def create_upload_session_endpoint(
+    request: Request,
+    magazine_id: str = Form(...),
+    category: str = Form(...),
+    filename: str = Form(...)
+):
+    """
+    {user_id}/magazine/{magazine_id}/{category} 에 올릴 파일 하나의 쓰기 전용 URL 발급
+    클라이언트는 upload_url 로 headers 를 붙여 PUT 한 뒤 /uploads/sessions/complete/ 를 호출
+    """
+    user_id = await get_current_user(request)
+    if not user_id:
+        return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"success": False, "message": "Login required"})
+
+    try:
+        session = create_upload_session(user_id, magazine_id, category, filename)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "message": str(e)})
+    return JSONResponse(status_code=201, content={"success": True, **session})
+
+
+@app.post("/uploads/sessions/complete/")
+async def complete_upload_session_endpoint(
+    request: Request,
+    magazine_id: str = Form(...),
+    category: str = Form(...),
+    upload_id: str = Form(...),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    직접 업로드가 끝난 파일을 검증 / 후처리 (이미지: 안전성 검사, 재인코딩, 축소본) 하고 manifest 에 등록
+    """
+    user_id = await get_current_user(request)
+    if not user_id:
+        return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"success": False, "message": "Login required"})
+
+    try:
+        result = await complete_upload_session(db, user_id, magazine_id, category, upload_id)
+    except BlobNotFoundError:
+        return JSONResponse(status_code=404, content={"success": False, "message": "Upload not found"})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "message": str(e)})
+
+    content = {"success": True, **result}
+    if category == "outputs":
+        # /outputs/upload/ 와 동일하게 User.outputPdf 에 SAS URL 저장
+        pdf_url = generate_blob_sas_url(user_id, magazine_id, "outputs", result["filename"], expiry_minutes=60)
+        await db.execute(
+            update(User)
+            .where(User.userID == user_id)
+            .values(outputPdf=pdf_url)
+            .execution_options(synchronize_session="fetch")
+        )
+        await db.commit()
+        content["pdf_url"] = pdf_url
+    return JSONResponse(status_code=201, content=content)
+
+
 @app.get("/images/")
-async def list_user_images(request: Request, magazine_id: str):
+async def list_user_images(request: Request, magazine_id: str, size: int | None = None, db: AsyncSession = Depends(get_read_db)):
     """
     Azure Blob Storage의 "user" Container 아래 {user_id}/magazine/{magazine_id}/images 폴더 속 이미지 조회
+    size 를 주면 해당 축소본의 JPEG(url) / WebP(webp_url) 주소를 반환
     """
     user_id = await get_current_user(request)
     if not user_id:
         return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"success": False, "message": "Login required"})
+    if size is not None and size not in IMAGE_VARIANT_SIZES:
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "message": f"size must be one of {list(IMAGE_VARIANT_SIZES)}"}
+        )
 
-    image_names = list_images(user_id, magazine_id)
-    image_urls = [generate_blob_sas_url(user_id, magazine_id, "images", name) for name in image_names]
-
+    image_names = await list_images(db, user_id, magazine_id)
+    if size is None:
+        image_urls = generate_blob_sas_urls(user_id, magazine_id, "images", image_names)
+        images = [{"name": name, "url": url} for name, url in zip(image_names, image_urls)]
+    else:
+        images = [
+            {"name": name, "size": size, "url": urls["jpg"], "webp_url": urls["webp"]}
+            for name, urls in zip(image_names, image_variant_urls(user_id, magazine_id, image_names, size))
+        ]
 
-    return JSONResponse(
-        status_code=200,
-        content={"success": True, "images": [{"name": n, "url": u} for n, u in zip(image_names, image_urls)]}
-    )
+    return JSONResponse(status_code=200, content={"success": True, "images": images})
 
 
 @app.post("/images/upload/")
-async def upload_user_images(request: Request, magazine_id: str = Form(...), files: List[UploadFile] = File(...)):
+async def upload_user_images(request: Request, magazine_id: str = Form(...), files: List[UploadFile] = File(...), db: AsyncSession = Depends(get_db)):
     """
     Azure Blob Storage의 "user" Container 아래 {user_id}/magazine/{magazine_id}/images 폴더에 이미지 업로드
     """
@@ -997,30 +1375,17 @@ async def upload_user_images(request: Request, magazine_id: str = Form(...), fil
     if not user_id:
         return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"success": False, "message": "Login required"})
 
-    uploaded = []
-    skipped = []
-
+    contents = []
+    read_errors = []
     for file in files:
         try:
-            content = await file.read()
-
-            # The updated function now handles safety check, processing, and naming internally
-            success, final_filename = upload_image_if_not_exists(user_id, magazine_id, file.filename, content)
-            
-            if success:
-                uploaded.append({
-                    "original_filename": file.filename,
-                    "stored_filename": final_filename
-                })
-            else:
-                skipped.append({"filename": file.filename, "reason": "Upload failed"})
-                
-        except ValueError as e:
-            # Handle validation errors (unsupported format, content safety, etc.)
-            skipped.append({"filename": file.filename, "reason": str(e)})
+            contents.append((file.filename, await file.read()))
         except Exception as e:
-            # Handle other errors
-            skipped.append({"filename": file.filename, "reason": f"Upload error: {str(e)}"})
+            read_errors.append({"filename": file.filename, "reason": f"Upload error: {str(e)}"})
+
+    # Safety check, processing, naming and upload run as a concurrent pipeline
+    uploaded, skipped = await upload_images(db, user_id, magazine_id, contents)
+    skipped.extend(read_errors)
 
     return JSONResponse(
         status_code=207,
@@ -1034,7 +1399,7 @@ async def upload_user_images(request: Request, magazine_id: str = Form(...), fil
 
 
 @app.delete("/images/delete/")
-async def delete_user_image(request: Request, magazine_id: str = Form(...), filename: str = Form(...)):
+async def delete_user_image(request: Request, magazine_id: str = Form(...), filename: str = Form(...), db: AsyncSession = Depends(get_db)):
     """
     Azure Blob Storage의 "user" Container 아래 {user_id}/magazine/{magazine_id}/images 폴더 속 이미지 삭제
     """
@@ -1042,12 +1407,12 @@ async def delete_user_image(request: Request, magazine_id: str = Form(...), file
     if not user_id:
         return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"success": False, "message": "Login required"})
 
-    delete_image(user_id, magazine_id, filename)
+    await delete_image(db, user_id, magazine_id, filename)
     return JSONResponse(status_code=200, content={"success": True, "message": "Image deleted successfully."})
 
 
 @app.get("/outputs/list/")
-async def list_outputs(request: Request, magazine_id: str):
+async def list_outputs(request: Request, magazine_id: str, db: AsyncSession = Depends(get_read_db)):
     """
     Azure Blob Storage의 "user" Container 아래 {user_id}/magazine/{magazine_id}/outputs 폴더 속 파일 목록 조회
     """
@@ -1055,7 +1420,7 @@ async def list_outputs(request: Request, magazine_id: str):
     if not user_id:
         return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"success": False, "message": "Login required"})
 
-    files = list_output_files(user_id, magazine_id)
+    files = await list_output_files(db, user_id, magazine_id)
     return JSONResponse(status_code=200, content={"success": True, "files": files})
 
 
@@ -1087,10 +1452,10 @@ async def upload_output_file_endpoint(request: Request, magazine_id: str = Form(
     if not user_id:
         return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"success": False, "message": "Login required"})
 
-    content = await file.read()
-
-    # Upload the PDF to Azure Blob Storage
-    upload_output_file(user_id, magazine_id, file.filename, content)
+    # Stream the PDF to Azure Blob Storage chunk by chunk
+    await upload_output_file(
+        db, user_id, magazine_id, file.filename, iter_upload_chunks(file, OUTPUT_UPLOAD_MAX_BYTES)
+    )
 
     # Generate SAS URL
     pdf_url = generate_blob_sas_url(user_id, magazine_id, "outputs", file.filename, expiry_minutes=60)
@@ -1111,7 +1476,7 @@ async def upload_output_file_endpoint(request: Request, magazine_id: str = Form(
 
 
 @app.post("/texts/upload/")
-async def upload_interview_text(request: Request, magazine_id: str = Form(...), text: str = Form(...)):
+async def upload_interview_text(request: Request, magazine_id: str = Form(...), text: str = Form(...), db: AsyncSession = Depends(get_db)):
     """
     Azure Blob Storage의 "user" Container 아래 {user_id}/magazine/{magazine_id}/texts 폴더 속 텍스트 파일 업로드
     """
@@ -1119,8 +1484,7 @@ async def upload_interview_text(request: Request, magazine_id: str = Form(...),
     if not user_id:
         return JSONResponse(status_code=401, content={"success": False, "message": "Login required"})
     
-    from app.azure_utils import upload_interview_result
-    blob_path = upload_interview_result(user_id, magazine_id, text.encode("utf-8"))
+    blob_path = await upload_interview_result(db, user_id, magazine_id, text.encode("utf-8"))
     
     # Extract the actual filename from the blob path
     final_filename = blob_path.split("/")[-1]
@@ -1133,7 +1497,7 @@ async def upload_interview_text(request: Request, magazine_id: str = Form(...),
 
 
 @app.delete("/texts/delete/")
-async def delete_interview_text(request: Request, magazine_id: str = Form(...), filename: str = Form(...)):
+async def delete_interview_text(request: Request, magazine_id: str = Form(...), filename: str = Form(...), db: AsyncSession = Depends(get_db)):
     """
     Azure Blob Storage의 "user" Container 아래 {user_id}/magazine/{magazine_id}/texts 폴더 속 텍스트 파일 삭제
     """
@@ -1142,16 +1506,16 @@ async def delete_interview_text(request: Request, magazine_id: str = Form(...),
         return JSONResponse(status_code=401, content={"success": False, "message": "Login required"})
 
     try:
-        delete_interview_result(user_id, magazine_id, filename)
+        await delete_interview_result(db, user_id, magazine_id, filename)
         return JSONResponse(status_code=200, content={"success": True})
-    except ResourceNotFoundError:
+    except BlobNotFoundError:
         return JSONResponse(status_code=404, content={"success": False, "message": "File not found"})
     except Exception as e:
         return JSONResponse(status_code=500, content={"success": False, "message": str(e)})
 
 
 @app.get("/texts/list/")
-async def list_interview_texts(request: Request, magazine_id: str):
+async def list_interview_texts(request: Request, magazine_id: str, db: AsyncSession = Depends(get_read_db)):
     """
     Azure Blob Storage의 "user" Container 아래 {user_id}/magazine/{magazine_id}/texts 폴더 속 텍스트 파일 조회
     """
@@ -1159,8 +1523,7 @@ async def list_interview_texts(request: Request, magazine_id: str):
     if not user_id:
         return JSONResponse(status_code=401, content={"success": False, "message": "Login required"})
 
-    from app.azure_utils import list_text_files
-    files = list_text_files(user_id, magazine_id)
+    files = await list_text_files(db, user_id, magazine_id)
     return JSONResponse(status_code=200, content={"success": True, "files": files})
 
 
@@ -1261,7 +1624,7 @@ async def add_daily(
     return daily
 
 @app.get("/mypage/daily/", response_model=list[DailyRead])
-async def daily_calendar(request: Request, db: AsyncSession = Depends(get_db)):
+async def daily_calendar(request: Request, db: AsyncSession = Depends(get_read_db)):
     user_id = await get_current_user(request)
     if not user_id:
         raise HTTPException(status_code=401, detail="로그인이 필요합니다.")
@@ -0,0 +1,452 @@
+"""
+운영용 관리 명령
+
+    python -m app.manage migrate
+    python -m app.manage check-query-plans
+    python -m app.manage reconcile-location-counts
+    python -m app.manage backfill-asset-manifest
+    python -m app.manage backfill-image-variants
+    python -m app.manage stress-toggle-like
+    python -m app.manage bench-upload-images
+    python -m app.manage bench-article-list
+    python -m app.manage bench-login-storm
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from unittest import mock
+
+from sqlalchemy import delete, func, insert, select, text
+
+from app.database import AsyncSessionLocal, engine
+from app.crud import get_article_list, rebuild_location_counts, toggle_like
+from app.models import Article, Like, User
+from app.migrations import migrate as apply_migrations, check_schema_version
+from app import image_processing, azure_utils, passwords
+from app.azure_utils import storage, backfill_asset_manifest, backfill_image_variants
+from app.storage import LocalStorage
+
+
+# 자주 실행되는 조회 쿼리 -> (사용해야 하는 인덱스, SQL). EXPLAIN 으로 해당 인덱스를 쓰는지 확인
+HOT_QUERIES = {
+    "article list (keyset)": (
+        "ix_article_created_id",
+        'SELECT "articleID" FROM article WHERE ("createdAt", "articleID") < (now(), \'\') '
+        'ORDER BY "createdAt" DESC, "articleID" DESC LIMIT 21',
+    ),
+    "my articles": (
+        "ix_article_author_created",
+        'SELECT "articleID" FROM article WHERE "articleAuthor" = \'u\' ORDER BY "createdAt" DESC',
+    ),
+    "articles by country": (
+        "ix_article_travel_country",
+        'SELECT "articleID" FROM article WHERE "travelCountry" = \'c\'',
+    ),
+    "article comments page": (
+        "ix_comment_article_created",
+        'SELECT "commentID" FROM comment WHERE "articleID" = \'a\' ORDER BY "createdAt", "commentID" LIMIT 21',
+    ),
+    "comments by author (delete_account)": (
+        "ix_comment_author",
+        'SELECT "commentID" FROM comment WHERE "commentAuthor" = \'u\'',
+    ),
+    "likes by user (delete_account)": (
+        "ix_like_user",
+        'SELECT "likeID" FROM "like" WHERE "userID" = \'u\'',
+    ),
+    "daily calendar": (
+        "ix_daily_user_date",
+        'SELECT id FROM daily WHERE "userID" = \'u\' ORDER BY date',
+    ),
+}
+
+
+def _plan_index_names(plan: dict) -> set[str]:
+    """플랜 트리의 (Bitmap) Index Scan 노드가 사용하는 인덱스 이름들"""
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= _plan_index_names(child)
+    return names
+
+
+async def migrate():
+    applied = await apply_migrations()
+    print(f"applied migrations: {applied}" if applied else "schema is up to date")
+
+
+async def check_query_plans():
+    await check_schema_version()
+    failed = []
+    async with engine.connect() as conn:
+        # 테이블이 작으면 플래너가 seq scan 을 고르므로 비활성화하고 인덱스 존재 여부만 확인
+        await conn.execute(text("SET enable_seqscan = off"))
+        for name, (index_name, sql) in HOT_QUERIES.items():
+            result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+            plan = result.scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            # seq scan 을 끄면 PK 인덱스 전체 스캔 + Filter 로도 피해 가므로 기대한 인덱스 이름까지 확인
+            used = _plan_index_names(plan[0]["Plan"])
+            ok = index_name in used
+            print(f"{'OK  ' if ok else 'FAIL'} {name} (expected {index_name}, used {', '.join(sorted(used)) or 'none'})")
+            if not ok:
+                failed.append(name)
+    if failed:
+        sys.exit(1)
+
+
+async def reconcile_location_counts():
+    await check_schema_version()
+    async with AsyncSessionLocal() as session:
+        rows = await rebuild_location_counts(session)
+    print(f"article_location_count rebuilt: {rows} (country, city) rows")
+
+
+async def backfill_asset_manifest_command():
+    await check_schema_version()
+    await storage.open()
+    try:
+        async with AsyncSessionLocal() as session:
+            registered = await backfill_asset_manifest(session)
+    finally:
+        await storage.close()
+    print(f"magazine_asset backfill: {registered} blobs scanned")
+
+
+async def backfill_image_variants_command():
+    await check_schema_version()
+    await storage.open()
+    try:
+        async with AsyncSessionLocal() as session:
+            generated, skipped = await backfill_image_variants(session)
+    finally:
+        await storage.close()
+        image_processing.shutdown()
+    print(f"image variants: {generated} images generated, {skipped} skipped")
+
+
+# stress-toggle-like: 좋아요를 누르는 사용자 수 / 사용자별 동시 작업 수 / 작업별 토글 횟수
+STRESS_LIKE_USERS = int(os.getenv("STRESS_LIKE_USERS", "20"))
+STRESS_LIKE_TASKS_PER_USER = int(os.getenv("STRESS_LIKE_TASKS_PER_USER", "2"))
+STRESS_LIKE_TOGGLES = int(os.getenv("STRESS_LIKE_TOGGLES", "25"))
+
+
+async def stress_toggle_like():
+    """
+    임시 글 하나에 여러 사용자가 (같은 사용자도 여러 작업으로) 동시에 좋아요를 토글한 뒤
+    article.likes 와 실제 like 행 수가 같은지 확인. 임시 데이터는 끝나면 삭제
+    """
+    await check_schema_version()
+    if engine.dialect.name != "postgresql":
+        # toggle_like 는 Postgres 의 INSERT ... ON CONFLICT / RETURNING 에 의존
+        print("stress-toggle-like requires PostgreSQL")
+        sys.exit(1)
+    prefix = f"__stress_{uuid.uuid4().hex[:8]}"
+    article_id = f"{prefix}_article"
+    user_ids = [f"{prefix}_user{i}" for i in range(STRESS_LIKE_USERS)]
+
+    async with AsyncSessionLocal() as session:
+        session.add_all(
+            User(userID=user_id, userName=user_id, userEmail=f"{user_id}@example.invalid", userPasswordHash="-")
+            for user_id in user_ids
+        )
+        await session.flush()
+        session.add(Article(articleID=article_id, articleTitle=prefix, articleAuthor=user_ids[0], likes=0))
+        await session.commit()
+
+    async def worker(user_id: str) -> int:
+        failures = 0
+        async with AsyncSessionLocal() as session:
+            for _ in range(STRESS_LIKE_TOGGLES):
+                result = await toggle_like(session, article_id, user_id)
+                if not result["success"]:
+                    failures += 1
+        return failures
+
+    try:
+        failures = await asyncio.gather(*(
+            worker(user_id) for user_id in user_ids for _ in range(STRESS_LIKE_TASKS_PER_USER)
+        ))
+        async with AsyncSessionLocal() as session:
+            likes = (await session.execute(
+                select(Article.likes).where(Article.articleID == article_id)
+            )).scalar_one()
+            rows = (await session.execute(
+                select(func.count(Like.likeID)).where(Like.articleID == article_id)
+            )).scalar_one()
+    finally:
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(Like).where(Like.articleID == article_id))
+            await session.execute(delete(Article).where(Article.articleID == article_id))
+            await session.execute(delete(User).where(User.userID.in_(user_ids)))
+            await session.commit()
+
+    toggles = STRESS_LIKE_USERS * STRESS_LIKE_TASKS_PER_USER * STRESS_LIKE_TOGGLES
+    ok = likes == rows and sum(failures) == 0
+    print(f"{'OK  ' if ok else 'FAIL'} {toggles} toggles: article.likes={likes}, like rows={rows}, "
+          f"failed toggles={sum(failures)}")
+    if not ok:
+        sys.exit(1)
+
+
+# bench-upload-images: 파일 수 목록 / 이미지 크기 / Content Safety 호출 대신 기다릴 시간 (ms)
+BENCH_UPLOAD_COUNTS = [int(v) for v in os.getenv("BENCH_UPLOAD_COUNTS", "1,4,8,16").split(",")]
+BENCH_UPLOAD_SIZE = tuple(int(v) for v in os.getenv("BENCH_UPLOAD_SIZE", "3000x2000").split("x"))
+BENCH_UPLOAD_SAFETY_MS = float(os.getenv("BENCH_UPLOAD_SAFETY_MS", "100"))
+
+
+def _bench_jpeg(seed: int) -> bytes:
+    from PIL import Image
+
+    # 노이즈 이미지라 JPEG 인코딩 비용이 실제 사진과 비슷함
+    image = Image.merge("RGB", [Image.effect_noise(BENCH_UPLOAD_SIZE, 40 + seed % 20) for _ in range(3)])
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def bench_upload_images():
+    """
+    upload_images 의 벽시계 시간을 파일 수별로 측정 (DB / Azure 없이 실행).
+    저장소는 임시 디렉터리의 LocalStorage, 일련번호 할당 / manifest 기록은 메모리 stub,
+    Content Safety 호출은 BENCH_UPLOAD_SAFETY_MS 만큼 기다리는 stub 으로 대체.
+    같은 파일들을 한 장씩 순서대로 올린 시간 (이전 방식) 과 비교합니다.
+    """
+    sequence = {}
+
+    async def allocate(db, user_id, magazine_id, category, count=1):
+        key = (user_id, magazine_id, category)
+        sequence[key] = sequence.get(key, 0) + count
+        return sequence[key] - count + 1
+
+    async def release(db, user_id, magazine_id, category, last_value, count):
+        key = (user_id, magazine_id, category)
+        if sequence.get(key) == last_value:
+            sequence[key] = last_value - count
+
+    async def register(*args, **kwargs):
+        pass
+
+    async def safety(image_bytes, filename=""):
+        await asyncio.sleep(BENCH_UPLOAD_SAFETY_MS / 1000)
+        return True, {"filename": filename}
+
+    files = [(f"photo{i}.jpg", _bench_jpeg(i)) for i in range(max(BENCH_UPLOAD_COUNTS))]
+    print(f"{BENCH_UPLOAD_SIZE[0]}x{BENCH_UPLOAD_SIZE[1]} JPEG ({len(files[0][1]) // 1024} KB), "
+          f"safety stub {BENCH_UPLOAD_SAFETY_MS:.0f} ms, {image_processing.IMAGE_PROCESS_WORKERS} process workers")
+
+    with tempfile.TemporaryDirectory() as root, contextlib.ExitStack() as stack:
+        stack.enter_context(mock.patch.object(azure_utils, "storage", LocalStorage(root, signing_key="bench")))
+        stack.enter_context(mock.patch.object(azure_utils, "allocate_asset_sequence", allocate))
+        stack.enter_context(mock.patch.object(azure_utils, "release_asset_sequence", release))
+        stack.enter_context(mock.patch.object(azure_utils, "register_asset", register))
+        stack.enter_context(mock.patch.object(azure_utils, "is_image_safe_for_upload", safety))
+        try:
+            # 프로세스 풀 기동 비용은 측정에서 제외
+            await azure_utils.upload_images(None, "bench", "warmup", files[:1])
+            print(f"{'files':>5} {'one-by-one s':>13} {'pipeline s':>11} {'per file ms':>12} {'speedup':>8}")
+            for count in BENCH_UPLOAD_COUNTS:
+                batch = files[:count]
+                started = time.perf_counter()
+                for file in batch:
+                    await azure_utils.upload_images(None, "bench", f"serial{count}", [file])
+                serial = time.perf_counter() - started
+
+                started = time.perf_counter()
+                uploaded, skipped = await azure_utils.upload_images(None, "bench", f"batch{count}", batch)
+                pipelined = time.perf_counter() - started
+                if skipped:
+                    print(f"skipped: {skipped}")
+                    sys.exit(1)
+                print(f"{count:>5} {serial:>13.2f} {pipelined:>11.2f} {pipelined / count * 1000:>12.0f} "
+                      f"{serial / pipelined:>7.1f}x")
+        finally:
+            image_processing.shutdown()
+
+
+# bench-article-list: 임시로 넣을 게시글 수 / 본문 크기 (bytes) / 측정 반복 횟수
+BENCH_ARTICLES = int(os.getenv("BENCH_ARTICLES", "100000"))
+BENCH_ARTICLE_CONTENT_BYTES = int(os.getenv("BENCH_ARTICLE_CONTENT_BYTES", "2000"))
+BENCH_ROUNDS = int(os.getenv("BENCH_ROUNDS", "3"))
+
+
+async def _list_full_articles(session):
+    """컬럼 projection 이전 방식: ORM 객체 전체 (본문 포함) 로드"""
+    result = await session.execute(select(Article).order_by(Article.createdAt.desc(), Article.articleID.desc()))
+    return result.scalars().all()
+
+
+async def _bench_list_query(load) -> tuple[int, float, float]:
+    """(행 수, 가장 빠른 회차의 초, tracemalloc 기준 최대 메모리 MB)"""
+    best = None
+    for _ in range(BENCH_ROUNDS):
+        async with AsyncSessionLocal() as session:
+            started = time.perf_counter()
+            rows = len(await load(session))
+            elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    # 메모리는 추적 오버헤드가 시간 측정에 섞이지 않도록 따로 한 번 더 실행
+    async with AsyncSessionLocal() as session:
+        tracemalloc.start()
+        try:
+            await load(session)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return rows, best, peak / (1024 * 1024)
+
+
+async def bench_article_list():
+    """
+    BENCH_ARTICLES 개의 임시 게시글을 넣고, 목록 조회를 select(Article) (ORM 전체 로드) 와
+    get_article_list (목록 컬럼 projection) 로 각각 실행해 rows/sec 와 최대 메모리를 비교.
+    임시 데이터는 끝나면 삭제. 운영 DB 가 아닌 스크래치 DB 에서 실행하세요.
+    """
+    await check_schema_version()
+    author = f"__bench_{uuid.uuid4().hex[:8]}"
+    body = ("여행 " * BENCH_ARTICLE_CONTENT_BYTES)[:BENCH_ARTICLE_CONTENT_BYTES]
+    started_at = datetime.utcnow() - timedelta(days=1)
+
+    async with AsyncSessionLocal() as session:
+        session.add(User(userID=author, userName=author, userEmail=f"{author}@example.invalid", userPasswordHash="-"))
+        await session.commit()
+        for start in range(0, BENCH_ARTICLES, 5000):
+            await session.execute(insert(Article), [
+                {
+                    "articleID": f"{author}_{i}", "articleTitle": f"bench article {i}", "articleAuthor": author,
+                    "content": body, "imageURL": f"https://example.invalid/{i}.jpg",
+                    "travelCountry": "KR", "travelCity": "Seoul", "price": float(i % 1000),
+                    "createdAt": started_at + timedelta(milliseconds=i), "modifiedAt": started_at,
+                    "likes": 0, "view_count": 0,
+                }
+                for i in range(start, min(start + 5000, BENCH_ARTICLES))
+            ])
+        await session.commit()
+
+    try:
+        print(f"{BENCH_ARTICLES} bench articles, {BENCH_ARTICLE_CONTENT_BYTES} byte bodies, best of {BENCH_ROUNDS}")
+        print(f"{'query':<28} {'rows':>8} {'seconds':>8} {'rows/sec':>10} {'peak MB':>8}")
+        for label, load in (("select(Article)", _list_full_articles), ("column projection", get_article_list)):
+            rows, seconds, peak_mb = await _bench_list_query(load)
+            print(f"{label:<28} {rows:>8} {seconds:>8.2f} {rows / seconds:>10.0f} {peak_mb:>8.1f}")
+    finally:
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(Article).where(Article.articleAuthor == author))
+            await session.execute(delete(User).where(User.userID == author))
+            await session.commit()
+
+
+# bench-login-storm: 동시 로그인 수 / 측정 시간 (초) / 다른 엔드포인트 호출 간격 (ms)
+BENCH_LOGIN_CONCURRENCY = int(os.getenv("BENCH_LOGIN_CONCURRENCY", "32"))
+BENCH_LOGIN_SECONDS = float(os.getenv("BENCH_LOGIN_SECONDS", "5"))
+BENCH_PROBE_INTERVAL_MS = float(os.getenv("BENCH_PROBE_INTERVAL_MS", "20"))
+
+
+async def _asgi_get(app, path: str):
+    """app 에 GET 요청 하나를 프로세스 안에서 보냄"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _login_storm(app, verify) -> tuple[int, list[float]]:
+    """verify 로 로그인 폭주를 일으키는 동안 GET /metrics/ 지연을 측정. (로그인 수, 지연 목록 ms)"""
+    password_hash = await passwords.hash_password("bench-password")
+    deadline = time.perf_counter() + BENCH_LOGIN_SECONDS
+    logins = 0
+
+    async def login_worker():
+        nonlocal logins
+        while time.perf_counter() < deadline:
+            await verify("bench-password", password_hash)
+            logins += 1
+
+    async def probe() -> list[float]:
+        # 요청은 일정 간격으로 도착한다고 보고, 지연은 예정 도착 시각부터 잼
+        # (이벤트 루프가 막혀 늦게 보낸 요청도 그만큼 느린 응답으로 집계됨)
+        latencies = []
+        scheduled = time.perf_counter()
+        while scheduled < deadline:
+            await asyncio.sleep(max(scheduled - time.perf_counter(), 0))
+            await _asgi_get(app, "/metrics/")
+            latencies.append((time.perf_counter() - scheduled) * 1000)
+            scheduled += BENCH_PROBE_INTERVAL_MS / 1000
+        return latencies
+
+    if verify is None:
+        return 0, await probe()
+    results = await asyncio.gather(probe(), *(login_worker() for _ in range(BENCH_LOGIN_CONCURRENCY)))
+    return logins, results[0]
+
+
+async def bench_login_storm():
+    """
+    로그인 폭주 중 관계없는 엔드포인트 (GET /metrics/, DB 미사용) 의 p50 / p99 지연을 비교.
+    - idle: 로그인 없음
+    - inline: 이전 방식처럼 bcrypt 를 이벤트 루프에서 바로 실행
+    - offloaded: passwords.verify_password (전용 스레드 풀, 동시 실행 수 제한)
+    로그인은 DB 조회 없이 bcrypt 검증만 실행합니다.
+    """
+    from app.main import app
+
+    async def inline_verify(password, password_hash):
+        return passwords.pwd_context.verify_and_update(password, password_hash)
+
+    print(f"bcrypt rounds {passwords.BCRYPT_ROUNDS}, {BENCH_LOGIN_CONCURRENCY} concurrent logins, "
+          f"{passwords.PASSWORD_HASH_WORKERS} hash workers, {BENCH_LOGIN_SECONDS:.0f} s per mode")
+    print(f"{'mode':<10} {'logins/s':>9} {'probes':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    try:
+        for mode, verify in (("idle", None), ("inline", inline_verify), ("offloaded", passwords.verify_password)):
+            logins, latencies = await _login_storm(app, verify)
+            print(f"{mode:<10} {logins / BENCH_LOGIN_SECONDS:>9.1f} {len(latencies):>7} "
+                  f"{_percentile(latencies, 50):>8.1f} {_percentile(latencies, 99):>8.1f} {max(latencies):>8.1f}")
+    finally:
+        passwords.shutdown()
+
+
+COMMANDS = {
+    "migrate": migrate,
+    "check-query-plans": check_query_plans,
+    "reconcile-location-counts": reconcile_location_counts,
+    "backfill-asset-manifest": backfill_asset_manifest_command,
+    "backfill-image-variants": backfill_image_variants_command,
+    "stress-toggle-like": stress_toggle_like,
+    "bench-upload-images": bench_upload_images,
+    "bench-article-list": bench_article_list,
+    "bench-login-storm": bench_login_storm,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="backtest 관리 명령")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    asyncio.run(COMMANDS[args.command]())
+
+
+if __name__ == "__main__":
+    main()
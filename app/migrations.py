@@ -0,0 +1,207 @@
+"""
+버전 관리되는 스키마 마이그레이션
+
+    python -m app.manage migrate
+
+- 적용된 버전은 schema_version 테이블에 기록됩니다.
+- 앱 시작 시에는 check_schema_version() 으로 버전만 확인하고 테이블을 introspect 하지 않습니다.
+- 새 스키마 변경은 MIGRATIONS 끝에 다음 버전 번호로 추가합니다. (이미 배포된 항목은 수정하지 않음)
+"""
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Callable
+
+from sqlalchemy import func, insert, inspect, select, text
+
+from app.database import engine
+from app.models import SchemaVersion
+
+logger = logging.getLogger(__name__)
+
+# 시작 시 스키마가 뒤처져 있으면 자동으로 migrate (개발용)
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    # 트랜잭션 안에서 실행할 sync 함수 (conn.run_sync 로 호출)
+    run: Callable | None = None
+    # 트랜잭션 밖(AUTOCOMMIT)에서 실행할 SQL. "{concurrently}" 는 postgres 에서 CONCURRENTLY 로 치환
+    statements: list[str] = field(default_factory=list)
+
+
+def _sql(*statements: str) -> Callable:
+    """고정된 DDL 을 실행하는 run 함수. (모델이 바뀌어도 이미 배포된 마이그레이션의 의미가 바뀌지 않도록 create_all 대신 사용)"""
+    def run(sync_conn):
+        for statement in statements:
+            sync_conn.execute(text(statement))
+    return run
+
+
+# 최초 배포 시점 모델(users / article / comment / like / daily)을 create_all 했을 때와 같은 스키마
+_initial_schema = _sql(
+    'CREATE TABLE IF NOT EXISTS users ('
+    '"userID" VARCHAR NOT NULL PRIMARY KEY, "userName" VARCHAR NOT NULL, "userEmail" VARCHAR NOT NULL UNIQUE, '
+    '"userPasswordHash" VARCHAR NOT NULL, "userCountry" VARCHAR, "userLanguage" VARCHAR, '
+    '"profileImage" VARCHAR, "outputPdf" VARCHAR)',
+    'CREATE INDEX IF NOT EXISTS "ix_users_userID" ON users ("userID")',
+    'CREATE TABLE IF NOT EXISTS article ('
+    '"articleID" VARCHAR NOT NULL PRIMARY KEY, "articleTitle" VARCHAR NOT NULL, '
+    '"articleAuthor" VARCHAR NOT NULL REFERENCES users ("userID"), "imageURL" VARCHAR, content TEXT, '
+    '"travelCountry" VARCHAR, "travelCity" VARCHAR, "createdAt" TIMESTAMP WITHOUT TIME ZONE, '
+    '"modifiedAt" TIMESTAMP WITHOUT TIME ZONE, "shareLink" VARCHAR, likes INTEGER, '
+    'view_count INTEGER NOT NULL, price FLOAT)',
+    'CREATE INDEX IF NOT EXISTS "ix_article_articleID" ON article ("articleID")',
+    'CREATE TABLE IF NOT EXISTS comment ('
+    '"commentID" SERIAL NOT NULL PRIMARY KEY, "articleID" VARCHAR NOT NULL REFERENCES article ("articleID"), '
+    '"commentAuthor" VARCHAR NOT NULL REFERENCES users ("userID"), content TEXT NOT NULL, '
+    '"createdAt" TIMESTAMP WITHOUT TIME ZONE, "modifiedAt" TIMESTAMP WITHOUT TIME ZONE)',
+    'CREATE INDEX IF NOT EXISTS "ix_comment_commentID" ON comment ("commentID")',
+    'CREATE TABLE IF NOT EXISTS "like" ('
+    '"likeID" SERIAL NOT NULL PRIMARY KEY, "articleID" VARCHAR NOT NULL REFERENCES article ("articleID"), '
+    '"userID" VARCHAR NOT NULL REFERENCES users ("userID"), "createdAt" TIMESTAMP WITHOUT TIME ZONE, '
+    'CONSTRAINT unique_user_article_like UNIQUE ("articleID", "userID"))',
+    'CREATE INDEX IF NOT EXISTS "ix_like_likeID" ON "like" ("likeID")',
+    'CREATE TABLE IF NOT EXISTS daily ('
+    'id SERIAL NOT NULL PRIMARY KEY, "userID" VARCHAR NOT NULL REFERENCES users ("userID"), '
+    'date TIMESTAMP WITHOUT TIME ZONE NOT NULL, season VARCHAR NOT NULL, weather VARCHAR NOT NULL, '
+    'temperature FLOAT NOT NULL, mood VARCHAR, country VARCHAR NOT NULL, '
+    '"createdAt" TIMESTAMP WITHOUT TIME ZONE, "updatedAt" TIMESTAMP WITHOUT TIME ZONE)',
+)
+
+_magazine_asset_manifest = _sql(
+    'CREATE TABLE IF NOT EXISTS magazine_asset ('
+    'id SERIAL NOT NULL PRIMARY KEY, "userID" VARCHAR NOT NULL, "magazineID" VARCHAR NOT NULL, '
+    'category VARCHAR NOT NULL, name VARCHAR NOT NULL, size INTEGER, sha256 VARCHAR, '
+    '"createdAt" TIMESTAMP WITHOUT TIME ZONE, '
+    'CONSTRAINT unique_magazine_asset UNIQUE ("userID", "magazineID", category, name))',
+    'CREATE TABLE IF NOT EXISTS magazine_sequence ('
+    '"userID" VARCHAR NOT NULL, "magazineID" VARCHAR NOT NULL, category VARCHAR NOT NULL, '
+    '"lastValue" INTEGER NOT NULL, PRIMARY KEY ("userID", "magazineID", category))',
+)
+
+
+_article_location_rollup = _sql(
+    'CREATE TABLE IF NOT EXISTS article_location_count ('
+    '"travelCountry" VARCHAR NOT NULL, "travelCity" VARCHAR NOT NULL, count INTEGER NOT NULL, '
+    'PRIMARY KEY ("travelCountry", "travelCity"))',
+    # 기존 글로 집계를 채움 (이미 있는 행은 실제 개수로 맞춤)
+    'INSERT INTO article_location_count ("travelCountry", "travelCity", count) '
+    'SELECT coalesce("travelCountry", \'\'), coalesce("travelCity", \'\'), count(*) FROM article GROUP BY 1, 2 '
+    'ON CONFLICT ("travelCountry", "travelCity") DO UPDATE SET count = EXCLUDED.count',
+)
+
+_content_version = _sql(
+    'CREATE TABLE IF NOT EXISTS content_version ('
+    'key VARCHAR NOT NULL PRIMARY KEY, version BIGINT NOT NULL, "bumpedAt" TIMESTAMP WITHOUT TIME ZONE)',
+    "INSERT INTO content_version (key, version, \"bumpedAt\") "
+    "VALUES ('articles', 0, now() at time zone 'utc'), ('article_views', 0, now() at time zone 'utc') "
+    "ON CONFLICT (key) DO NOTHING",
+)
+
+
+MIGRATIONS = [
+    Migration(1, "initial schema", run=_initial_schema),
+    Migration(2, "hot-path indexes", statements=[
+        'CREATE INDEX {concurrently}IF NOT EXISTS ix_article_created_id ON article ("createdAt", "articleID")',
+        'CREATE INDEX {concurrently}IF NOT EXISTS ix_article_author_created ON article ("articleAuthor", "createdAt")',
+        'CREATE INDEX {concurrently}IF NOT EXISTS ix_article_travel_country ON article ("travelCountry")',
+        'CREATE INDEX {concurrently}IF NOT EXISTS ix_comment_article_created ON comment ("articleID", "createdAt", "commentID")',
+        'CREATE INDEX {concurrently}IF NOT EXISTS ix_comment_author ON comment ("commentAuthor")',
+        'CREATE INDEX {concurrently}IF NOT EXISTS ix_like_user ON "like" ("userID")',
+        'CREATE INDEX {concurrently}IF NOT EXISTS ix_daily_user_date ON daily ("userID", date)',
+    ]),
+    # 기존 잡지는 python -m app.manage backfill-asset-manifest 로 채움
+    Migration(3, "magazine asset manifest", run=_magazine_asset_manifest),
+    Migration(4, "seed article location counts", run=_article_location_rollup),
+    Migration(5, "content version counters", run=_content_version),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def get_schema_version() -> int:
+    """
+    적용된 최신 마이그레이션 버전 (schema_version 테이블이 없으면 0).
+    DB 접속 실패 등 다른 오류는 그대로 전파 (버전 0 으로 오인해 migrate 하지 않도록)
+    """
+    async with engine.connect() as conn:
+        has_table = await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table(SchemaVersion.__tablename__))
+        if not has_table:
+            return 0
+        result = await conn.execute(select(func.max(SchemaVersion.version)))
+        return result.scalar() or 0
+
+
+_INDEX_NAME_RE = re.compile(r"INDEX \{concurrently\}IF NOT EXISTS (\w+)")
+
+
+async def _index_is_valid(conn, name: str) -> bool | None:
+    """pg_index.indisvalid (인덱스가 없으면 None)"""
+    result = await conn.execute(
+        text("SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"),
+        {"name": name}
+    )
+    return result.scalar()
+
+
+async def _apply(migration: Migration):
+    if migration.run is not None:
+        async with engine.begin() as conn:
+            await conn.run_sync(migration.run)
+
+    if migration.statements:
+        # CREATE INDEX CONCURRENTLY 는 트랜잭션 안에서 실행할 수 없음
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            postgres = conn.dialect.name == "postgresql"
+            concurrently = "CONCURRENTLY " if postgres else ""
+            for statement in migration.statements:
+                match = _INDEX_NAME_RE.search(statement)
+                if postgres and match:
+                    # 실패한 CREATE INDEX CONCURRENTLY 는 INVALID 인덱스를 남기고, IF NOT EXISTS 는 그것을 건너뜀
+                    if await _index_is_valid(conn, match.group(1)) is False:
+                        logger.warning(f"Dropping invalid index {match.group(1)} before rebuilding it")
+                        await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)}"))
+                await conn.execute(text(statement.format(concurrently=concurrently)))
+                if postgres and match and not await _index_is_valid(conn, match.group(1)):
+                    raise RuntimeError(f"Index {match.group(1)} was not built (still invalid or missing)")
+
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(SchemaVersion).values(version=migration.version, description=migration.description)
+        )
+
+
+async def migrate() -> list[int]:
+    """대기 중인 마이그레이션을 순서대로 적용하고, 적용한 버전 목록을 반환"""
+    async with engine.begin() as conn:
+        await conn.run_sync(SchemaVersion.__table__.create, checkfirst=True)
+
+    current = await get_schema_version()
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        logger.info(f"Applying migration {migration.version}: {migration.description}")
+        await _apply(migration)
+        applied.append(migration.version)
+    return applied
+
+
+async def check_schema_version():
+    """앱 시작 시 스키마 버전만 확인 (뒤처져 있으면 DB_AUTO_MIGRATE 가 아닌 한 시작 실패)"""
+    current = await get_schema_version()
+    if current >= LATEST_VERSION:
+        return
+    if DB_AUTO_MIGRATE:
+        await migrate()
+        return
+    raise RuntimeError(
+        f"Database schema is at version {current}, expected {LATEST_VERSION}. "
+        "Run `python -m app.manage migrate` first."
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, Text, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, String, Integer, BigInteger, Float, Text, DateTime, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 
@@ -42,6 +42,21 @@ class Article(Base):
     comments = relationship("Comment", back_populates="article")
     article_likes = relationship("Like", back_populates="article")  # Add this line
 
+    # 목록 keyset pagination / 마이페이지 / 나라별 조회용 (app/migrations.py 에서 생성)
+    __table_args__ = (
+        Index('ix_article_created_id', 'createdAt', 'articleID'),
+        Index('ix_article_author_created', 'articleAuthor', 'createdAt'),
+        Index('ix_article_travel_country', 'travelCountry'),
+    )
+
+# 나라/도시별 게시글 수 집계 (create/update/delete_article 에서 함께 갱신)
+class ArticleLocationCount(Base):
+    __tablename__ = 'article_location_count'
+
+    travelCountry = Column(String, primary_key=True)  # 값이 없으면 '' 로 저장
+    travelCity = Column(String, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
 class Comment(Base):
     __tablename__ = 'comment'
     
@@ -55,6 +70,12 @@ class Comment(Base):
     article = relationship("Article", back_populates="comments")
     user = relationship("User", back_populates="comments")
 
+    # 글별 댓글 keyset pagination (articleID, createdAt, commentID)
+    __table_args__ = (
+        Index('ix_comment_article_created', 'articleID', 'createdAt', 'commentID'),
+        Index('ix_comment_author', 'commentAuthor'),
+    )
+
 # New model for likes
 class Like(Base):
     __tablename__ = 'like'
@@ -70,6 +91,7 @@ class Like(Base):
     # Ensure a user can only like an article once
     __table_args__ = (
         UniqueConstraint('articleID', 'userID', name='unique_user_article_like'),
+        Index('ix_like_user', 'userID'),
     )
 
 class Daily(Base):
@@ -86,4 +108,50 @@ class Daily(Base):
     createdAt = Column(DateTime, default=datetime.utcnow)
     updatedAt = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    user = relationship("User", back_populates="dailies")
\ No newline at end of file
+    user = relationship("User", back_populates="dailies")
+
+    __table_args__ = (
+        Index('ix_daily_user_date', 'userID', 'date'),
+    )
+
+# 잡지별 자산(이미지/텍스트/출력물) 목록. 스토리지를 list 하지 않고 이 테이블에서 조회
+class MagazineAsset(Base):
+    __tablename__ = 'magazine_asset'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    userID = Column(String, nullable=False)
+    magazineID = Column(String, nullable=False)
+    category = Column(String, nullable=False)   # images / texts / outputs
+    name = Column(String, nullable=False)
+    size = Column(Integer, nullable=True)
+    sha256 = Column(String, nullable=True)
+    createdAt = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('userID', 'magazineID', 'category', 'name', name='unique_magazine_asset'),
+    )
+
+# 잡지/카테고리별 일련번호 (image{n}.jpg). UPSERT ... RETURNING 으로 원자적으로 할당
+class MagazineSequence(Base):
+    __tablename__ = 'magazine_sequence'
+
+    userID = Column(String, primary_key=True)
+    magazineID = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    lastValue = Column(Integer, default=0, nullable=False)
+
+# 목록 ETag / 응답 캐시 버전용 카운터. 'articles' 는 글 생성/수정/삭제 시, 'article_views' 는 조회수 반영 시 증가
+class ContentVersion(Base):
+    __tablename__ = 'content_version'
+
+    key = Column(String, primary_key=True)
+    version = Column(BigInteger, default=0, nullable=False)
+    bumpedAt = Column(DateTime, default=datetime.utcnow)
+
+# 적용된 마이그레이션 기록 (app/migrations.py)
+class SchemaVersion(Base):
+    __tablename__ = 'schema_version'
+
+    version = Column(Integer, primary_key=True)
+    description = Column(String, nullable=False)
+    appliedAt = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
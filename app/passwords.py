@@ -0,0 +1,40 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+# bcrypt cost. 값을 바꾸면 기존 해시는 다음 로그인 때 새 cost 로 재해시됩니다.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# 해시 전용 스레드 수 (= 동시에 실행되는 bcrypt 연산 수)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# 비밀번호 해시화 설정
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt 는 GIL 을 풀고 계산하므로 별도 스레드에서 돌리면 이벤트 루프가 막히지 않음
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_semaphore: asyncio.Semaphore | None = None
+
+
+async def _run(func, *args):
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(PASSWORD_HASH_WORKERS)
+    async with _semaphore:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(pwd_context.hash, password)
+
+
+async def verify_password(password: str, password_hash: str) -> tuple[bool, str | None]:
+    """
+    Returns (일치 여부, 새 해시). 새 해시는 cost 나 알고리즘이 바뀌어 재해시가 필요할 때만 반환됩니다.
+    """
+    return await _run(pwd_context.verify_and_update, password, password_hash)
+
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,468 @@
+"""
+Storage backends behind the helpers in app/azure_utils.py.
+
+STORAGE_BACKEND=azure (default) stores blobs in the Azure "user" container;
+STORAGE_BACKEND=local stores them under LOCAL_STORAGE_ROOT and serves signed URLs
+from the app itself (GET /storage/...), so the pipeline can run offline on one box.
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+import time
+import math
+import shutil
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from urllib.parse import quote
+
+import aiofiles
+import aiohttp
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.storage.blob import BlobBlock, BlobSasPermissions, ContentSettings, generate_blob_sas
+from azure.storage.blob.aio import BlobServiceClient
+
+
+# Signed read URLs expire on a grid of expiry * SAS_REFRESH_FRACTION seconds, so every request (and worker)
+# in the same window gets a byte-identical URL that browsers / CDNs can cache; a URL is re-signed once
+# the window moves on, while it still has at least expiry_minutes left.
+SAS_REFRESH_FRACTION = float(os.getenv("SAS_REFRESH_FRACTION", "0.5"))
+SAS_CACHE_SIZE = int(os.getenv("SAS_CACHE_SIZE", "10000"))
+
+
+def aligned_expiry(now: float, expiry_minutes: int) -> int:
+    step = max(int(expiry_minutes * 60 * SAS_REFRESH_FRACTION), 1)
+    return math.ceil((now + expiry_minutes * 60) / step) * step
+
+
+class StorageError(Exception):
+    pass
+
+
+class BlobNotFoundError(StorageError):
+    pass
+
+
+class BlobExistsError(StorageError):
+    pass
+
+
+class StorageBackend:
+    """Blob store interface. Paths are '/'-separated names inside the user container."""
+
+    def __init__(self):
+        self._signed_urls: OrderedDict[tuple[str, int], tuple[int, str]] = OrderedDict()
+        self.sign_hits = 0
+        self.sign_misses = 0
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def put(self, path: str, data: bytes, content_type: str | None = None, overwrite: bool = True):
+        raise NotImplementedError
+
+    async def put_stream(self, path: str, chunks: AsyncIterator[bytes], content_type: str | None = None,
+                         overwrite: bool = True) -> int:
+        """Write chunks as they arrive (never holding the whole blob); returns the blob size."""
+        raise NotImplementedError
+
+    async def get(self, path: str, offset: int = 0, length: int | None = None) -> bytes:
+        raise NotImplementedError
+
+    async def size(self, path: str) -> int:
+        raise NotImplementedError
+
+    async def exists(self, path: str) -> bool:
+        raise NotImplementedError
+
+    async def list_names(self, prefix: str) -> list[str]:
+        """Full names of all blobs starting with prefix."""
+        raise NotImplementedError
+
+    async def list_prefixes(self, prefix: str) -> list[str]:
+        """Names of the 'folders' directly under prefix (one level, no blobs below it are enumerated)."""
+        raise NotImplementedError
+
+    async def copy(self, source: str, path: str):
+        """Copy blob source to path (overwriting path) without passing the bytes through the app."""
+        raise NotImplementedError
+
+    async def delete(self, path: str):
+        raise NotImplementedError
+
+    def _sign_url_at(self, path: str, expires: int) -> str:
+        """Read-only URL for path valid until the unix time expires."""
+        raise NotImplementedError
+
+    def sign_url(self, path: str, expiry_minutes: int = 30) -> str:
+        """Read-only URL for path valid for at least expiry_minutes (memoized per expiry window)."""
+        return self._cached_sign(path, expiry_minutes, aligned_expiry(time.time(), expiry_minutes))
+
+    def sign_urls(self, paths: list[str], expiry_minutes: int = 30) -> list[str]:
+        """sign_url for many paths; one clock reading, so all URLs share the same expiry."""
+        expires = aligned_expiry(time.time(), expiry_minutes)
+        return [self._cached_sign(path, expiry_minutes, expires) for path in paths]
+
+    def _cached_sign(self, path: str, expiry_minutes: int, expires: int) -> str:
+        key = (path, expiry_minutes)
+        cached = self._signed_urls.get(key)
+        if cached is not None and cached[0] == expires:
+            self._signed_urls.move_to_end(key)
+            self.sign_hits += 1
+            return cached[1]
+        self.sign_misses += 1
+        url = self._sign_url_at(path, expires)
+        self._signed_urls[key] = (expires, url)
+        self._signed_urls.move_to_end(key)
+        while len(self._signed_urls) > SAS_CACHE_SIZE:
+            self._signed_urls.popitem(last=False)
+        return url
+
+    def sign_upload_url(self, path: str, expiry_minutes: int = 15) -> tuple[str, dict]:
+        """Write-only URL for a client-side PUT of path, plus the headers the PUT must carry."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        signs = self.sign_hits + self.sign_misses
+        return {
+            "backend": type(self).__name__,
+            "signed_urls": {
+                "cached": len(self._signed_urls),
+                "hits": self.sign_hits,
+                "misses": self.sign_misses,
+                "hit_rate": round(self.sign_hits / signs, 4) if signs else 0.0,
+            },
+        }
+
+
+class AzureBlobStorage(StorageBackend):
+    def __init__(self, connection_string: str, account_name: str, account_key: str,
+                 container_name: str = "user", max_connections: int = 100):
+        super().__init__()
+        self.connection_string = connection_string
+        self.account_name = account_name
+        self.account_key = account_key
+        self.container_name = container_name
+        self.max_connections = max_connections
+        self.client: BlobServiceClient | None = None
+        self.container_client = None
+        self._container_lock = asyncio.Lock()
+        self.requests = 0
+
+    def _count_request(self, request):
+        self.requests += 1
+
+    def _open_client(self):
+        if self.client is None:
+            session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_connections))
+            self.client = BlobServiceClient.from_connection_string(
+                self.connection_string,
+                transport=AioHttpTransport(session=session, session_owner=True),
+                raw_request_hook=self._count_request,
+            )
+
+    async def open(self):
+        """Open the long-lived client and HTTP connection pool, and verify the container once."""
+        self._open_client()
+        await self.get_or_create_container()
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+            self.container_client = None
+
+    async def get_or_create_container(self):
+        """Container client cached for the life of the process (existence checked only once)."""
+        if self.container_client is not None:
+            return self.container_client
+        async with self._container_lock:
+            if self.container_client is None:
+                self._open_client()
+                container_client = self.client.get_container_client(self.container_name)
+                try:
+                    await container_client.create_container()
+                except ResourceExistsError:
+                    pass
+                self.container_client = container_client
+        return self.container_client
+
+    async def _blob(self, path: str):
+        container_client = await self.get_or_create_container()
+        return container_client.get_blob_client(path)
+
+    async def put(self, path: str, data: bytes, content_type: str | None = None, overwrite: bool = True):
+        blob_client = await self._blob(path)
+        kwargs = {"content_settings": ContentSettings(content_type=content_type)} if content_type else {}
+        try:
+            await blob_client.upload_blob(data, overwrite=overwrite, **kwargs)
+        except ResourceExistsError as e:
+            raise BlobExistsError(path) from e
+
+    async def put_stream(self, path: str, chunks: AsyncIterator[bytes], content_type: str | None = None,
+                         overwrite: bool = True) -> int:
+        # one staged block per chunk, committed at the end; uncommitted blocks expire on their own
+        blob_client = await self._blob(path)
+        blocks = []
+        size = 0
+        async for chunk in chunks:
+            block_id = uuid.uuid4().hex
+            await blob_client.stage_block(block_id, chunk, length=len(chunk))
+            blocks.append(BlobBlock(block_id=block_id))
+            size += len(chunk)
+        kwargs = {"content_settings": ContentSettings(content_type=content_type)} if content_type else {}
+        if not overwrite:
+            kwargs["match_condition"] = MatchConditions.IfMissing
+        try:
+            await blob_client.commit_block_list(blocks, **kwargs)
+        except (ResourceExistsError, ResourceModifiedError) as e:
+            raise BlobExistsError(path) from e
+        return size
+
+    async def get(self, path: str, offset: int = 0, length: int | None = None) -> bytes:
+        blob_client = await self._blob(path)
+        try:
+            downloader = await blob_client.download_blob(offset=offset, length=length)
+            return await downloader.readall()
+        except ResourceNotFoundError as e:
+            raise BlobNotFoundError(path) from e
+
+    async def size(self, path: str) -> int:
+        blob_client = await self._blob(path)
+        try:
+            properties = await blob_client.get_blob_properties()
+        except ResourceNotFoundError as e:
+            raise BlobNotFoundError(path) from e
+        return properties.size
+
+    async def exists(self, path: str) -> bool:
+        blob_client = await self._blob(path)
+        return await blob_client.exists()
+
+    async def list_names(self, prefix: str) -> list[str]:
+        container_client = await self.get_or_create_container()
+        return [blob.name async for blob in container_client.list_blobs(name_starts_with=prefix)]
+
+    async def list_prefixes(self, prefix: str) -> list[str]:
+        container_client = await self.get_or_create_container()
+        names = []
+        # with a delimiter the service returns one BlobPrefix per sub-folder instead of every blob below it
+        async for item in container_client.walk_blobs(name_starts_with=prefix, delimiter="/"):
+            if item.name.endswith("/"):
+                names.append(item.name[len(prefix):-1])
+        return sorted(names)
+
+    async def copy(self, source: str, path: str):
+        # synchronous server-side copy (source up to 256 MiB), authorized by a short-lived read SAS
+        blob_client = await self._blob(path)
+        source_url = self._sign_url_at(source, int(time.time()) + 600)
+        try:
+            await blob_client.start_copy_from_url(source_url, requires_sync=True)
+        except ResourceNotFoundError as e:
+            raise BlobNotFoundError(source) from e
+
+    async def delete(self, path: str):
+        blob_client = await self._blob(path)
+        try:
+            await blob_client.delete_blob()
+        except ResourceNotFoundError as e:
+            raise BlobNotFoundError(path) from e
+
+    def _sign_url_at(self, path: str, expires: int) -> str:
+        sas_token = generate_blob_sas(
+            account_name=self.account_name,
+            container_name=self.container_name,
+            blob_name=path,
+            account_key=self.account_key,
+            permission=BlobSasPermissions(read=True),
+            expiry=datetime.fromtimestamp(expires, timezone.utc)
+        )
+        return f"https://{self.account_name}.blob.core.windows.net/{self.container_name}/{path}?{sas_token}"
+
+    def sign_upload_url(self, path: str, expiry_minutes: int = 15) -> tuple[str, dict]:
+        sas_token = generate_blob_sas(
+            account_name=self.account_name,
+            container_name=self.container_name,
+            blob_name=path,
+            account_key=self.account_key,
+            permission=BlobSasPermissions(create=True, write=True),
+            expiry=datetime.now(timezone.utc) + timedelta(minutes=expiry_minutes)
+        )
+        url = f"https://{self.account_name}.blob.core.windows.net/{self.container_name}/{path}?{sas_token}"
+        return url, {"x-ms-blob-type": "BlockBlob"}
+
+    def stats(self) -> dict:
+        return {**super().stats(), "requests": self.requests}
+
+
+class LocalStorage(StorageBackend):
+    """Blobs as files under root; signed URLs are HMAC-protected app URLs (see verify_signature)."""
+
+    def __init__(self, root: str, signing_key: str, base_url: str = "/storage"):
+        super().__init__()
+        self.root = Path(root).resolve()
+        self.signing_key = signing_key.encode("utf-8")
+        self.base_url = base_url.rstrip("/")
+
+    @staticmethod
+    def _check_segments(path: str):
+        # blob names are literal in Azure, so '..' / '.' / empty segments are rejected rather than
+        # resolved (resolving them would let one user's path reach into another user's folder)
+        if any(segment in ("", ".", "..") for segment in path.split("/")):
+            raise StorageError(f"Invalid blob path: {path}")
+
+    def _file(self, path: str) -> Path:
+        self._check_segments(path)
+        file_path = (self.root / path).resolve()
+        if self.root not in file_path.parents:
+            raise StorageError(f"Invalid blob path: {path}")
+        return file_path
+
+    async def _tmp_file(self, path: str) -> tuple[Path, Path]:
+        file_path = self._file(path)
+        await asyncio.to_thread(file_path.parent.mkdir, parents=True, exist_ok=True)
+        return file_path, file_path.with_name(f".{file_path.name}.{os.getpid()}.{time.monotonic_ns()}.tmp")
+
+    async def put(self, path: str, data: bytes, content_type: str | None = None, overwrite: bool = True):
+        file_path, tmp_path = await self._tmp_file(path)
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                await f.write(data)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        await self._commit(path, file_path, tmp_path, overwrite)
+
+    async def put_stream(self, path: str, chunks: AsyncIterator[bytes], content_type: str | None = None,
+                         overwrite: bool = True) -> int:
+        file_path, tmp_path = await self._tmp_file(path)
+        size = 0
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                async for chunk in chunks:
+                    await f.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        await self._commit(path, file_path, tmp_path, overwrite)
+        return size
+
+    async def _commit(self, path: str, file_path: Path, tmp_path: Path, overwrite: bool):
+        try:
+            if overwrite:
+                await asyncio.to_thread(os.replace, tmp_path, file_path)
+            else:
+                # link fails if the target exists, so concurrent creates cannot clobber each other
+                await asyncio.to_thread(os.link, tmp_path, file_path)
+        except FileExistsError as e:
+            raise BlobExistsError(path) from e
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    async def get(self, path: str, offset: int = 0, length: int | None = None) -> bytes:
+        try:
+            async with aiofiles.open(self._file(path), "rb") as f:
+                await f.seek(offset)
+                return await f.read(-1 if length is None else length)
+        except FileNotFoundError as e:
+            raise BlobNotFoundError(path) from e
+
+    async def size(self, path: str) -> int:
+        try:
+            return (await asyncio.to_thread(self._file(path).stat)).st_size
+        except FileNotFoundError as e:
+            raise BlobNotFoundError(path) from e
+
+    async def exists(self, path: str) -> bool:
+        return await asyncio.to_thread(self._file(path).is_file)
+
+    def _list_names(self, prefix: str) -> list[str]:
+        # only walk the deepest directory the prefix names
+        if "/" in prefix:
+            folder = prefix.rsplit("/", 1)[0]
+            self._check_segments(folder)
+            base = self.root / folder
+        else:
+            base = self.root
+        names = []
+        for dirpath, _, filenames in os.walk(base):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                name = (Path(dirpath) / filename).relative_to(self.root).as_posix()
+                if name.startswith(prefix):
+                    names.append(name)
+        return sorted(names)
+
+    async def list_names(self, prefix: str) -> list[str]:
+        return await asyncio.to_thread(self._list_names, prefix)
+
+    def _list_prefixes(self, prefix: str) -> list[str]:
+        self._check_segments(prefix.rstrip("/"))
+        base = self.root / prefix
+        if not base.resolve().is_relative_to(self.root) or not base.is_dir():
+            return []
+        return sorted(entry.name for entry in os.scandir(base) if entry.is_dir())
+
+    async def list_prefixes(self, prefix: str) -> list[str]:
+        return await asyncio.to_thread(self._list_prefixes, prefix)
+
+    async def copy(self, source: str, path: str):
+        source_path = self._file(source)
+        file_path, tmp_path = await self._tmp_file(path)
+        try:
+            await asyncio.to_thread(shutil.copyfile, source_path, tmp_path)
+        except FileNotFoundError as e:
+            raise BlobNotFoundError(source) from e
+        await self._commit(path, file_path, tmp_path, overwrite=True)
+
+    async def delete(self, path: str):
+        try:
+            await asyncio.to_thread(self._file(path).unlink)
+        except FileNotFoundError as e:
+            raise BlobNotFoundError(path) from e
+
+    def _signature(self, path: str, expires: int, write: bool = False) -> str:
+        message = f"{path}\n{expires}\nwrite" if write else f"{path}\n{expires}"
+        return hmac.new(self.signing_key, message.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def _sign_url_at(self, path: str, expires: int) -> str:
+        return f"{self.base_url}/{quote(path)}?exp={expires}&sig={self._signature(path, expires)}"
+
+    def sign_upload_url(self, path: str, expiry_minutes: int = 15) -> tuple[str, dict]:
+        expires = int(time.time()) + expiry_minutes * 60
+        return f"{self.base_url}/{quote(path)}?exp={expires}&sig={self._signature(path, expires, write=True)}", {}
+
+    def verify_signature(self, path: str, expires: int, signature: str, write: bool = False) -> bool:
+        """Read and write signatures are distinct, so a download URL cannot be used to upload."""
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self._signature(path, expires, write=write), signature)
+
+
+def create_storage_backend() -> StorageBackend:
+    """Build the backend selected by STORAGE_BACKEND (read when called, after .env is loaded)."""
+    backend = os.getenv("STORAGE_BACKEND", "azure").lower()
+    if backend == "local":
+        return LocalStorage(
+            root=os.getenv("LOCAL_STORAGE_ROOT", "storage"),
+            signing_key=os.getenv("LOCAL_STORAGE_SIGNING_KEY") or os.getenv("SESSION_SECRET_KEY") or "",
+        )
+    if backend == "azure":
+        return AzureBlobStorage(
+            connection_string=os.getenv("AZURE_STORAGE_CONNECTION_STRING"),
+            account_name=os.getenv("AZURE_STORAGE_ACCOUNT_NAME"),
+            account_key=os.getenv("AZURE_STORAGE_ACCOUNT_KEY"),
+            max_connections=int(os.getenv("AZURE_BLOB_MAX_CONNECTIONS", "100")),
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import os
+
+from app.database import AsyncSessionLocal
+from app.crud import flush_view_counts
+
+logger = logging.getLogger(__name__)
+
+# 조회수 flush 주기 (초)
+VIEW_COUNT_FLUSH_INTERVAL = float(os.getenv("VIEW_COUNT_FLUSH_INTERVAL", "5"))
+
+
+class ViewCountBuffer:
+    """
+    게시글 조회수를 프로세스 메모리에 모았다가 주기적으로 한 번에 DB 에 반영하는 write-behind 버퍼.
+    article_detail 읽기 요청마다 row lock 을 잡는 UPDATE 를 하지 않도록 합니다.
+    """
+
+    def __init__(self, interval: float = VIEW_COUNT_FLUSH_INTERVAL):
+        self.interval = interval
+        self._deltas: dict[str, int] = {}
+        # flush 중인 증가분. 커밋되기 전까지는 pending 에 계속 포함해서 응답의 조회수가 줄어들지 않게 함
+        self._flushing: dict[str, int] = {}
+        self._task: asyncio.Task | None = None
+        self.flushed_total = 0
+        self.flush_failures = 0
+
+    def add(self, article_id: str, delta: int = 1):
+        self._deltas[article_id] = self._deltas.get(article_id, 0) + delta
+
+    def pending(self, article_id: str) -> int:
+        return self._deltas.get(article_id, 0) + self._flushing.get(article_id, 0)
+
+    def stats(self) -> dict:
+        return {
+            "pending_articles": len(self._deltas),
+            "pending_views": sum(self._deltas.values()),
+            "flushed_views": self.flushed_total,
+            "flush_failures": self.flush_failures,
+            "interval_seconds": self.interval,
+        }
+
+    async def flush(self):
+        if not self._deltas:
+            return
+        # 버퍼를 통째로 교체해서 flush 도중 들어오는 조회는 다음 주기로 넘김
+        deltas, self._deltas = self._deltas, {}
+        self._flushing = deltas
+        committed = False
+        try:
+            async with AsyncSessionLocal() as session:
+                await flush_view_counts(session, deltas)
+                committed = True
+            self.flushed_total += sum(deltas.values())
+        except Exception as e:
+            # 실패한 증가분은 버리지 않고 다시 버퍼에 합침
+            self.flush_failures += 1
+            self._requeue(deltas)
+            logger.error(f"View count flush failed: {e}")
+        except BaseException:
+            # stop() 의 취소 등으로 중단되면 커밋 전 증가분을 되돌려 놓고 마지막 flush 에서 반영
+            if not committed:
+                self._requeue(deltas)
+            raise
+        finally:
+            self._flushing = {}
+
+    def _requeue(self, deltas: dict[str, int]):
+        for article_id, delta in deltas.items():
+            self.add(article_id, delta)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+view_counter = ViewCountBuffer()